@@ -1,4 +1,5 @@
 from django import forms
+from django.db import transaction
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from .models import UserProfile
@@ -20,7 +21,15 @@ class CustomUserCreationForm(UserCreationForm):
         user.first_name = self.cleaned_data["first_name"]
         user.last_name = self.cleaned_data["last_name"]
         if commit:
-            user.save()
+            # The user and their profile are written together or not at all
+            with transaction.atomic():
+                user.save()
+                UserProfile.objects.create(
+                    user=user,
+                    student_id=self.cleaned_data.get("student_id"),
+                    phone=self.cleaned_data.get("phone"),
+                    role='student'
+                )
         return user
 
 class UserProfileForm(forms.ModelForm):
@@ -0,0 +1,71 @@
+import csv
+import io
+import os
+import tempfile
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+BENCHMARK_PREFIX = 'benchsignup'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark signups per second through the signup form and through import_students'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20, help='Students created by each method')
+        parser.add_argument('--iterations', type=int, default=100000, help='PBKDF2 iterations for the import run')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        self.cleanup()
+        try:
+            self.report('Signup form', count, self.signup_form(count))
+            self.report('import_students', count, self.import_roster(count, None))
+            self.report(f'import_students ({options["iterations"]} iter)', count, self.import_roster(count, options['iterations']))
+        finally:
+            self.cleanup()
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(f'{label:<34} {elapsed * 1000 / count:8.1f} ms/student  {count / elapsed:8.1f} students/s')
+
+    def signup_form(self, count):
+        url = reverse('accounts:signup')
+        started = perf_counter()
+        for n in range(count):
+            client = Client()
+            username = f'{BENCHMARK_PREFIX}_form_{n}'
+            response = client.post(url, {
+                'username': username,
+                'first_name': 'Bench',
+                'last_name': f'Student {n}',
+                'email': f'{username}@college.edu',
+                'password1': 'Canteen-bench-42',
+                'password2': 'Canteen-bench-42',
+            })
+            if response.status_code != 302:
+                self.stdout.write(self.style.ERROR(f'Signup of {username} failed'))
+        return perf_counter() - started
+
+    def import_roster(self, count, iterations):
+        run = 'iter' if iterations else 'default'
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as roster:
+            writer = csv.writer(roster)
+            writer.writerow(['username', 'email', 'first_name', 'last_name', 'password'])
+            for n in range(count):
+                username = f'{BENCHMARK_PREFIX}_{run}_{n}'
+                writer.writerow([username, f'{username}@college.edu', 'Bench', f'Student {n}', 'Canteen-bench-42'])
+        try:
+            started = perf_counter()
+            call_command('import_students', roster.name, iterations=iterations, stdout=io.StringIO())
+            return perf_counter() - started
+        finally:
+            os.unlink(roster.name)
+
+    def cleanup(self):
+        User.objects.filter(username__startswith=f'{BENCHMARK_PREFIX}_').delete()
@@ -10,14 +10,8 @@ def signup(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
+            # Creates the user and their student profile in one transaction
             user = form.save()
-            # Create user profile
-            UserProfile.objects.create(
-                user=user,
-                student_id=form.cleaned_data.get('student_id'),
-                phone=form.cleaned_data.get('phone'),
-                role='student'
-            )
             login(request, user)
             messages.success(request, 'Account created successfully!')
             return redirect('canteen:menu')
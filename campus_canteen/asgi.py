@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campus_canteen.settings')
 
 application = get_asgi_application()
+
+# Compile templates, load URLs and prime the menu before the first request
+from django.conf import settings  # noqa: E402
+
+from canteen.warmup import warm_up  # noqa: E402
+
+if settings.CANTEEN_WARMUP:
+    warm_up()
@@ -1,4 +1,6 @@
 import os
+import sys
+from datetime import time
 from pathlib import Path
 from decouple import config
 
@@ -32,6 +34,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'canteen.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'campus_canteen.urls'
@@ -47,6 +50,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'canteen.context_processors.outlets',
             ],
         },
     },
@@ -58,6 +62,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep each worker thread's connection between requests, testing it before reuse
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
     }
 }
 
@@ -99,4 +106,43 @@ LOGOUT_REDIRECT_URL = 'canteen:menu'
 
 # Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
-CRISPY_TEMPLATE_PACK = "bootstrap5"
\ No newline at end of file
+CRISPY_TEMPLATE_PACK = "bootstrap5"
+
+# Cache
+# Published menu versions, stock levels, slot loads and idempotency keys must be
+# shared by every worker process, so production needs Redis or Memcached, e.g.
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379
+# The default local-memory cache only suits a single-process development server.
+# FileBasedCache with a directory as CACHE_LOCATION works for a few processes on
+# one host, but it lists the whole directory on every write.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+if 'test' in sys.argv[1:2]:
+    # Tests clear the cache freely, so they never share one with a running server
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+if CACHES['default']['BACKEND'].endswith(('LocMemCache', 'FileBasedCache')):
+    CACHES['default']['OPTIONS'] = {'MAX_ENTRIES': 10000}  # Dish card fragments alone outgrow the default 300
+
+# Canteen
+CANTEEN_KITCHEN_OPENS_AT = time(7, 0)  # Slot suggestions leave preparation_time after this
+CANTEEN_KITCHEN_STATIONS = config('CANTEEN_KITCHEN_STATIONS', default=4, cast=int)  # Batches cooked in parallel
+CANTEEN_KITCHEN_BATCH_PORTIONS = 20  # Largest batch of one dish a station cooks at once
+CANTEEN_IDEMPOTENCY_TTL = 60 * 60 * 24  # Seconds a repeated booking request returns the original order
+CANTEEN_PROFILING_SAMPLE_RATE = config('CANTEEN_PROFILING_SAMPLE_RATE', default=0.0, cast=float)  # Share of requests profiled; staff can add ?profile=1
+CANTEEN_PROFILING_DIR = BASE_DIR / 'profiles'
+CANTEEN_PROFILING_KEEP = 200  # Newest profiles kept on disk
+CANTEEN_TASK_RETRY_DELAY = 30  # Seconds before the first retry of a failed background task, doubling after
+CANTEEN_TASK_MAX_RETRY_DELAY = 60 * 60
+CANTEEN_TASK_TIMEOUT = 60 * 10  # Running tasks older than this are assumed lost and run again
+CANTEEN_DISH_IMAGE_MAX_SIZE = 800  # Longest side in pixels of stored dish photos
+CANTEEN_NOTIFICATION_BATCH_SIZE = 100  # Emails sent per outbox claim, all over one connection
+CANTEEN_SITE_URL = config('CANTEEN_SITE_URL', default='http://localhost:8000')  # Prefix for links in emails
+CANTEEN_PWA_CACHE_VERSION = 'v1'  # Bump to make installed service workers drop their cached pages and assets
+CANTEEN_WARMUP = config('CANTEEN_WARMUP', default=True, cast=bool)  # Warm templates, URLs, DB and menu caches when a worker starts
+
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Campus Canteen <noreply@campus-canteen.local>')
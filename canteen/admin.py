@@ -1,5 +1,20 @@
-from django.contrib import admin
-from .models import Category, Dish, Review, PreOrder, PickupSlot
+from django.contrib import admin, messages
+from django.db import transaction
+from django.utils import timezone
+from .models import (
+    ArchivedPreOrder, BackgroundTask, Canteen, Category, DailyOrderRollup, DailyStock, Dish, Notification, OrderStatusEvent,
+    Review, PreOrder, PickupSlot, WaitlistEntry,
+)
+from .audit import buffered_events
+from .booking import BookingError, change_status
+from .pagination import EstimatedCountPaginator
+from .tasks import resize_dish_image
+
+@admin.register(Canteen)
+class CanteenAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'location', 'is_active']
+    list_filter = ['is_active']
+    prepopulated_fields = {'slug': ['name']}
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -9,30 +24,133 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Dish)
 class DishAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'dish_type', 'price', 'is_available', 'is_featured']
-    list_filter = ['category', 'dish_type', 'is_available', 'is_featured']
+    list_display = ['name', 'canteen', 'category', 'dish_type', 'price', 'is_available', 'is_featured']
+    list_filter = ['canteen', 'category', 'dish_type', 'is_available', 'is_featured']
     search_fields = ['name', 'description']
     list_editable = ['is_available', 'is_featured', 'price']
     readonly_fields = ['created_at', 'updated_at']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Resizing a large upload is left to the task worker
+        if 'image' in form.changed_data and obj.image:
+            resize_dish_image.delay(dish_id=obj.pk)
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['user', 'dish', 'rating', 'created_at']
     list_filter = ['rating', 'created_at', 'dish__category']
-    search_fields = ['user__username', 'dish__name', 'comment']
+    # Index-backed lookups only; a substring search over every comment scans the table
+    search_fields = ['=user__username', '^dish__name']
     readonly_fields = ['created_at']
+    date_hierarchy = 'created_at'
+    list_select_related = ['user', 'dish']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 @admin.register(PreOrder)
 class PreOrderAdmin(admin.ModelAdmin):
     list_display = ['order_number', 'user', 'dish', 'quantity', 'pickup_slot', 'date', 'status', 'total_amount']
-    list_filter = ['status', 'date', 'pickup_slot', 'dish__category']
-    search_fields = ['order_number', 'user__username', 'dish__name']
+    list_filter = ['canteen', 'status', 'date', 'pickup_slot', 'dish__category']
+    search_fields = ['=order_number', '=user__username']
     list_editable = ['status']
-    readonly_fields = ['order_number', 'total_amount', 'created_at', 'updated_at']
+    readonly_fields = ['canteen', 'order_number', 'total_amount', 'created_at', 'updated_at']
     date_hierarchy = 'date'
+    list_select_related = ['user', 'dish', 'pickup_slot']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    def save_model(self, request, obj, form, change):
+        if not (change and 'status' in form.changed_data):
+            super().save_model(request, obj, form, change)
+            return
+        # Same path as the staff pages, so stock, the waitlist and ready emails follow the new status
+        try:
+            change_status(obj, obj.status, request.user, from_status=form.initial['status'])
+        except BookingError as error:
+            obj.status = form.initial['status']
+            super().save_model(request, obj, form, change)
+            self.message_user(request, str(error), messages.ERROR)
+    
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST':
+            return super().changelist_view(request, extra_context)
+        # Status edits from list_editable are written as one batch of events, committed with the edits themselves
+        with transaction.atomic(), buffered_events():
+            return super().changelist_view(request, extra_context)
 
 @admin.register(PickupSlot)
 class PickupSlotAdmin(admin.ModelAdmin):
-    list_display = ['start_time', 'end_time', 'max_orders', 'is_active']
-    list_filter = ['is_active']
-    list_editable = ['max_orders', 'is_active']
\ No newline at end of file
+    list_display = ['start_time', 'end_time', 'canteen', 'max_orders', 'is_active']
+    list_filter = ['canteen', 'is_active']
+    list_select_related = ['canteen']
+    list_editable = ['max_orders', 'is_active']
+
+@admin.register(ArchivedPreOrder)
+class ArchivedPreOrderAdmin(admin.ModelAdmin):
+    list_display = ['order_number', 'user', 'dish', 'quantity', 'date', 'status', 'total_amount']
+    list_filter = ['canteen', 'status']
+    search_fields = ['=order_number']
+    date_hierarchy = 'date'
+    list_select_related = ['user', 'dish']
+
+@admin.register(DailyOrderRollup)
+class DailyOrderRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'dish', 'status', 'order_count', 'item_count', 'total_amount']
+    list_filter = ['status']
+    date_hierarchy = 'date'
+    list_select_related = ['dish']
+
+@admin.register(DailyStock)
+class DailyStockAdmin(admin.ModelAdmin):
+    list_display = ['dish', 'date', 'quantity', 'remaining']
+    list_filter = ['date']
+    search_fields = ['dish__name']
+    list_select_related = ['dish']
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'updated_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['created_at', 'updated_at']
+    actions = ['retry_tasks']
+    
+    @admin.action(description='Run selected tasks again now')
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status='running').update(status='pending', attempts=0, run_at=timezone.now())
+        self.message_user(request, f'{updated} tasks queued again')
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['=recipient', 'subject']
+    readonly_fields = ['created_at', 'sent_at']
+    list_select_related = ['user']
+
+@admin.register(OrderStatusEvent)
+class OrderStatusEventAdmin(admin.ModelAdmin):
+    list_display = ['order_number', 'from_status', 'to_status', 'changed_at', 'seconds_in_previous', 'changed_by']
+    list_filter = ['to_status', 'from_status']
+    search_fields = ['=order_number']
+    date_hierarchy = 'changed_at'
+    list_select_related = ['changed_by']
+    
+    # The history is append-only
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'dish', 'pickup_slot', 'date', 'quantity', 'status', 'created_at', 'preorder']
+    list_filter = ['status', 'pickup_slot']
+    search_fields = ['user__username', 'dish__name']
+    date_hierarchy = 'date'
+    list_select_related = ['user', 'dish', 'pickup_slot', 'preorder']
+    readonly_fields = ['preorder', 'created_at', 'updated_at']
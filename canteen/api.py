@@ -0,0 +1,314 @@
+"""
+Lightweight JSON API for kiosk and mobile clients.
+
+Responses are built from values() querysets rather than model instances, carry
+an ETag of their body and answer a matching If-None-Match with 304.
+"""
+import hashlib
+import json
+from datetime import date, timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from . import booking
+from .booking import BookingError, place_preorder
+from .forms import PreOrderForm
+from .idempotency import find_order, get_request_key
+from .menu import (
+    MENU_PER_PAGE, available_dishes, changes_version, filter_dishes, last_removal, outlet_dishes, parse_changes_version,
+    sort_dishes,
+)
+from .models import Dish, PreOrder
+from .outlets import get_default_outlet, get_outlet
+from .pagination import keyset_page
+from .reviews import get_rating_summary
+from .stock import get_stock_levels
+
+ORDERS_PER_PAGE = 20
+ORDER_ORDERING = ('-created_at', '-id')
+
+# Public field name -> values() lookup
+DISH_FIELDS = {
+    'id': 'id',
+    'name': 'name',
+    'description': 'description',
+    'category': 'category__name',
+    'category_id': 'category_id',
+    'canteen_id': 'canteen_id',
+    'dish_type': 'dish_type',
+    'price': 'price',
+    'image': 'image',
+    'is_featured': 'is_featured',
+    'preparation_time': 'preparation_time',
+}
+DISH_DETAIL_FIELDS = dict(DISH_FIELDS, ingredients='ingredients', is_available='is_available')
+SYNC_FIELDS = dict(DISH_FIELDS, is_available='is_available', updated_at='updated_at')
+# Changes this close to the client's version are sent again, in case a slower
+# transaction committed an older updated_at after the client synced
+SYNC_OVERLAP = timedelta(seconds=5)
+ORDER_FIELDS = {
+    'order_number': 'order_number',
+    'status': 'status',
+    'canteen_id': 'canteen_id',
+    'dish_id': 'dish_id',
+    'dish_name': 'dish__name',
+    'quantity': 'quantity',
+    'date': 'date',
+    'pickup_slot_id': 'pickup_slot_id',
+    'total_amount': 'total_amount',
+    'special_instructions': 'special_instructions',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+
+def json_response(request, payload, status=200, private=False):
+    """Compact JSON response with an ETag; a matching If-None-Match gets an empty 304"""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    etag = '"%s"' % hashlib.md5(body).hexdigest()
+    cache_control = 'private, no-cache' if private else 'no-cache'
+
+    if status == 200 and request.method in ('GET', 'HEAD'):
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Cache-Control'] = cache_control
+            return response
+
+    response = HttpResponse(body, status=status, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    return response
+
+
+def error_response(request, message, status, **extra):
+    return json_response(request, dict(error=message, **extra), status=status, private=True)
+
+
+def api_login_required(view_func):
+    """Like login_required, but answers 401 JSON instead of redirecting to the login page"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response(request, 'Authentication required', 401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def select_fields(request, available):
+    """Fields requested with ?fields=a,b (all by default), or None if one is unknown"""
+    requested = [name for name in request.GET.get('fields', '').split(',') if name]
+    if not requested:
+        return list(available)
+    if any(name not in available for name in requested):
+        return None
+    return requested
+
+
+def _rows(queryset, fields, available, extra=()):
+    """values() rows renamed to public field names; extra lookups are kept for cursors"""
+    lookups = {name: available[name] for name in fields}
+    rows = queryset.values(*lookups.values(), *[lookup for lookup in extra if lookup not in lookups.values()])
+    return rows, lookups
+
+
+def _public(row, lookups):
+    data = {name: row[lookup] for name, lookup in lookups.items()}
+    if data.get('image'):
+        data['image'] = settings.MEDIA_URL + data['image']
+    return data
+
+
+def _request_outlet(request):
+    slug = request.GET.get('canteen')
+    return get_outlet(slug) if slug else get_default_outlet()
+
+
+@require_GET
+def menu(request):
+    """Available dishes of an outlet (?canteen=<slug>) with the menu page's filters, one cursor page at a time"""
+    fields = select_fields(request, DISH_FIELDS)
+    if fields is None:
+        return error_response(request, 'Unknown field requested', 400, fields=list(DISH_FIELDS))
+
+    category = request.GET.get('category', '')
+    if category and not category.isdigit():
+        return error_response(request, 'category must be a category id', 400)
+
+    outlet = _request_outlet(request)
+    if outlet is None:
+        return error_response(request, 'Unknown canteen', 404)
+
+    dishes = filter_dishes(
+        available_dishes(outlet['id']),
+        request.GET.get('search', ''),
+        category,
+        request.GET.get('dish_type', ''),
+    )
+    dishes, ordering = sort_dishes(dishes, request.GET.get('sort', 'name'))
+    rows, lookups = _rows(dishes, fields, DISH_FIELDS, extra=[field.lstrip('-') for field in ordering])
+    rows, next_cursor, _ = keyset_page(rows, ordering, request.GET.get('cursor'), MENU_PER_PAGE)
+
+    return json_response(request, {
+        'results': [_public(row, lookups) for row in rows],
+        'next_cursor': next_cursor,
+    })
+
+
+@require_GET
+def menu_changes(request):
+    """Dishes of an outlet changed since ?since=<version>, for clients keeping a local copy of the menu.
+
+    Without a version every available dish is sent. dish_ids lists every dish
+    still on the menu so clients can drop the ones that are gone; it is only
+    included when a dish was withdrawn or deleted after the client's version.
+    """
+    fields = select_fields(request, SYNC_FIELDS)
+    if fields is None:
+        return error_response(request, 'Unknown field requested', 400, fields=list(SYNC_FIELDS))
+    outlet = _request_outlet(request)
+    if outlet is None:
+        return error_response(request, 'Unknown canteen', 404)
+
+    dishes = outlet_dishes(outlet['id'])
+    since = request.GET.get('since')
+    if since:
+        try:
+            seen_at = parse_changes_version(since) - SYNC_OVERLAP
+        except (ValueError, OverflowError):
+            return error_response(request, 'since must be a version returned by this endpoint', 400)
+        changed = dishes.filter(updated_at__gt=seen_at)
+    else:
+        changed = dishes.filter(is_available=True)
+
+    rows, lookups = _rows(changed.order_by('updated_at', 'id'), fields, SYNC_FIELDS, extra=['updated_at'])
+    rows = list(rows)
+    if rows:
+        version = changes_version(rows[-1]['updated_at'])
+    else:
+        version = since or changes_version(None)
+
+    data = {'version': version, 'changed': [_public(row, lookups) for row in rows]}
+    if not since or seen_at < last_removal(outlet['id']):
+        data['dish_ids'] = list(dishes.filter(is_available=True).order_by('id').values_list('id', flat=True))
+    return json_response(request, data)
+
+
+@require_GET
+def dish_detail(request, pk):
+    """One dish with its rating summary and remaining stock for a date"""
+    fields = select_fields(request, DISH_DETAIL_FIELDS)
+    if fields is None:
+        return error_response(request, 'Unknown field requested', 400, fields=list(DISH_DETAIL_FIELDS))
+
+    rows, lookups = _rows(Dish.objects.filter(pk=pk), fields, DISH_DETAIL_FIELDS)
+    row = rows.first()
+    if row is None:
+        return error_response(request, 'Dish not found', 404)
+
+    data = _public(row, lookups)
+    if not request.GET.get('fields'):
+        stock = get_stock_levels(_stock_date(request))
+        data['rating'] = get_rating_summary(Dish(pk=pk))
+        data['stock_remaining'] = stock.get(pk)
+    return json_response(request, data)
+
+
+def _stock_date(request):
+    try:
+        return date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        return date.today() + timedelta(days=1)
+
+
+def _order_data(user, order_number):
+    rows, lookups = _rows(PreOrder.objects.filter(user=user, order_number=order_number), ORDER_FIELDS, ORDER_FIELDS)
+    row = rows.first()
+    return _public(row, lookups) if row else None
+
+
+def _request_data(request):
+    """Form-encoded or JSON request body as a dict"""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+@api_login_required
+@require_http_methods(['GET', 'POST'])
+def orders(request):
+    """GET lists the user's orders newest first; POST places a new order"""
+    if request.method == 'POST':
+        return _create_order(request)
+
+    fields = select_fields(request, ORDER_FIELDS)
+    if fields is None:
+        return error_response(request, 'Unknown field requested', 400, fields=list(ORDER_FIELDS))
+
+    preorders = PreOrder.objects.filter(user=request.user)
+    status = request.GET.get('status')
+    if status:
+        preorders = preorders.filter(status=status)
+    rows, lookups = _rows(preorders, fields, ORDER_FIELDS, extra=[field.lstrip('-') for field in ORDER_ORDERING])
+    rows, next_cursor, _ = keyset_page(rows, ORDER_ORDERING, request.GET.get('cursor'), ORDERS_PER_PAGE)
+
+    return json_response(request, {
+        'results': [_public(row, lookups) for row in rows],
+        'next_cursor': next_cursor,
+    }, private=True)
+
+
+def _create_order(request):
+    data = _request_data(request)
+    if data is None:
+        return error_response(request, 'Request body must be a JSON object', 400)
+
+    # A retried request returns the original order before any validation or writes
+    idempotency_key = get_request_key(request, data.get('idempotency_key'))
+    existing = find_order(request.user, idempotency_key)
+    if existing:
+        return json_response(request, _order_data(request.user, existing.order_number), private=True)
+
+    dish = Dish.objects.filter(pk=data.get('dish'), is_available=True).first() if str(data.get('dish', '')).isdigit() else None
+    if dish is None:
+        return error_response(request, 'Unknown or unavailable dish', 400)
+
+    form = PreOrderForm(data, dish=dish)
+    if not form.is_valid():
+        return error_response(request, 'Invalid order', 400, errors=form.errors.get_json_data())
+    try:
+        preorder, created = place_preorder(request.user, dish, form, idempotency_key)
+    except BookingError as error:
+        return error_response(request, str(error), 409)
+
+    return json_response(request, _order_data(request.user, preorder.order_number), status=201 if created else 200, private=True)
+
+
+@api_login_required
+@require_GET
+def order_detail(request, order_number):
+    """Status and details of one of the user's orders"""
+    data = _order_data(request.user, order_number)
+    if data is None:
+        return error_response(request, 'Order not found', 404)
+    return json_response(request, data, private=True)
+
+
+@api_login_required
+@require_POST
+def order_cancel(request, order_number):
+    """Cancel one of the user's pending or confirmed orders"""
+    preorder = PreOrder.objects.filter(user=request.user, order_number=order_number).first()
+    if preorder is None:
+        return error_response(request, 'Order not found', 404)
+    if not booking.cancel_preorder(preorder, request.user):
+        return error_response(request, 'Cannot cancel this order', 409, order_status=preorder.status)
+    return json_response(request, _order_data(request.user, order_number), private=True)
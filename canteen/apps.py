@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CanteenConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'canteen'
+
+    def ready(self):
+        from . import connections, notifications, signals  # noqa: F401
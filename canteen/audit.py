@@ -0,0 +1,108 @@
+"""
+Order status history.
+
+Every transition is appended to OrderStatusEvent. Inside buffered_events()
+the events are collected and written with a single INSERT when the block
+ends, so bulk status changes and admin list edits cost one write.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import OrderStatusEvent
+
+PERCENTILES = (50, 90, 95)
+
+_local = threading.local()
+
+
+@contextmanager
+def buffered_events():
+    """Collect status events recorded in the block and write them together at the end"""
+    if getattr(_local, 'events', None) is not None:
+        # Already buffering; the outermost block writes
+        yield
+        return
+    _local.events = []
+    try:
+        yield
+        write_events(_local.events)
+    finally:
+        _local.events = None
+
+
+def record_status_change(orders, to_status, user=None, from_status=None):
+    """Append a transition for each order; from_status defaults to the order's current status"""
+    now = timezone.now()
+    events = [
+        OrderStatusEvent(
+            preorder_id=order.id,
+            order_number=order.order_number,
+            dish_id=order.dish_id,
+            pickup_slot_id=order.pickup_slot_id,
+            pickup_date=order.date,
+            from_status=order.status if from_status is None else from_status,
+            to_status=to_status,
+            changed_at=now,
+            changed_by=user if user is not None and user.is_authenticated else None,
+        )
+        for order in orders
+        if (order.status if from_status is None else from_status) != to_status
+    ]
+    buffer = getattr(_local, 'events', None)
+    if buffer is not None:
+        buffer.extend(events)
+    else:
+        write_events(events)
+    return len(events)
+
+
+def write_events(events):
+    """Fill in time spent in the previous status and insert all events in one batch"""
+    if not events:
+        return
+    order_ids = {event.preorder_id for event in events}
+    entered_at = dict(
+        OrderStatusEvent.objects.filter(preorder_id__in=order_ids)
+        .values_list('preorder_id')
+        .annotate(last=Max('changed_at'))
+        .order_by()
+    )
+    for event in sorted(events, key=lambda event: event.changed_at):
+        previous = entered_at.get(event.preorder_id)
+        if previous is not None and event.from_status:
+            event.seconds_in_previous = max(int((event.changed_at - previous).total_seconds()), 0)
+        entered_at[event.preorder_id] = event.changed_at
+    OrderStatusEvent.objects.bulk_create(events)
+
+
+def time_in_status_report(since, group_by='dish'):
+    """Nearest-rank percentiles of seconds spent in each status, per dish or per pickup slot.
+
+    CUME_DIST ranks every duration within its (group, status) partition and
+    the outer query picks the first duration at or past each percentile, so
+    the whole report is one aggregate query.
+    """
+    column = {'dish': 'dish_id', 'slot': 'pickup_slot_id'}[group_by]
+    table = OrderStatusEvent._meta.db_table
+    percentile_columns = ', '.join(
+        f'MIN(CASE WHEN cume >= {p / 100} THEN seconds_in_previous END) AS p{p}' for p in PERCENTILES
+    )
+    sql = f"""
+        SELECT group_id, from_status, COUNT(*) AS transitions, AVG(seconds_in_previous) AS mean, {percentile_columns}
+        FROM (
+            SELECT {column} AS group_id, from_status, seconds_in_previous,
+                   CUME_DIST() OVER (PARTITION BY {column}, from_status ORDER BY seconds_in_previous) AS cume
+            FROM {table}
+            WHERE changed_at >= %s AND seconds_in_previous IS NOT NULL
+        ) ranked
+        GROUP BY group_id, from_status
+        ORDER BY group_id, from_status
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [since])
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
@@ -0,0 +1,83 @@
+from django.db import IntegrityError, transaction
+
+from .audit import record_status_change
+from .idempotency import claim_key, find_order
+from .models import PickupSlot
+from .notifications import queue_order_ready
+from .slots import invalidate_slot_loads
+from .stock import RESERVED_STATUSES, STOCK_STATUSES, release_stock, reserve_stock
+from .waitlist import promote_waiting
+
+
+class BookingError(Exception):
+    """A valid booking request that cannot be fulfilled, e.g. the dish sold out"""
+
+
+def place_preorder(user, dish, form, idempotency_key=None):
+    """Save a validated PreOrderForm for a user, returning (preorder, created).
+
+    The idempotency key claim, the stock reservation and the order itself are
+    written in one transaction. When the key was already used, the original
+    order is returned with created=False and nothing is written.
+    """
+    preorder = form.save(commit=False)
+    preorder.user = user
+    preorder.dish = dish
+
+    try:
+        with transaction.atomic():
+            claim = claim_key(user, idempotency_key) if idempotency_key else None
+            if not reserve_stock(dish, preorder.date, preorder.quantity):
+                raise BookingError(f'Sorry, not enough {dish.name} left for {preorder.date:%b %d}.')
+            preorder.save()
+            record_status_change([preorder], preorder.status, user, from_status='')
+            if claim:
+                claim.preorder = preorder
+                claim.save(update_fields=['preorder'])
+    except IntegrityError:
+        # A concurrent request with the same key won the race
+        existing = find_order(user, idempotency_key)
+        if existing:
+            return existing, False
+        raise
+
+    invalidate_slot_loads(preorder.date, preorder.canteen_id)
+    return preorder, True
+
+
+def cancel_preorder(preorder, user=None):
+    """Cancel a pending or confirmed order and give its portions back, returning False otherwise.
+
+    The freed place goes to the next student on the slot's waitlist in the same transaction.
+    """
+    if preorder.status not in ['pending', 'confirmed']:
+        return False
+    change_status(preorder, 'cancelled', user)
+    return True
+
+
+def change_status(preorder, new_status, user=None, from_status=None):
+    """Move an order to another status with the stock, waitlist and email side effects.
+
+    from_status defaults to the order's current status; pass it when the
+    instance already carries the new one, as in an admin form. Raises
+    BookingError when reopening a cancelled order finds too few portions left.
+    """
+    from_status = preorder.status if from_status is None else from_status
+    if new_status == from_status:
+        return
+    with transaction.atomic():
+        if new_status in STOCK_STATUSES and from_status not in STOCK_STATUSES:
+            # A cancelled order holds no portions, so reopening it takes them again
+            if not reserve_stock(preorder.dish, preorder.date, preorder.quantity):
+                raise BookingError(f'Not enough {preorder.dish.name} left on {preorder.date} to reopen order #{preorder.order_number}')
+        elif new_status == 'cancelled' and from_status in RESERVED_STATUSES:
+            release_stock(preorder.dish_id, preorder.date, preorder.quantity)
+        record_status_change([preorder], new_status, user, from_status=from_status)
+        preorder.status = new_status
+        preorder.save()
+        if new_status == 'ready':
+            queue_order_ready([preorder])
+        if new_status == 'cancelled' and from_status in PickupSlot.ACTIVE_ORDER_STATUSES:
+            promote_waiting(preorder.pickup_slot, preorder.date)
+    invalidate_slot_loads(preorder.date, preorder.canteen_id)
@@ -0,0 +1,61 @@
+"""
+Database connection reuse.
+
+With CONN_MAX_AGE each worker thread keeps its connection open between
+requests, and with CONN_HEALTH_CHECKS a kept connection is tested before its
+first query of a request, so a database restart costs one reconnect instead of
+an error. For the file-based SQLite database that is all the pooling there is
+to do: a thread's persistent connection is its pool of one.
+
+The counters below record, for this process, how many requests were served
+and how many connections were opened per database, which gives the share of
+requests that reused a connection.
+"""
+import os
+import threading
+from collections import Counter
+
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_lock = threading.Lock()
+_counts = Counter()
+
+
+@receiver(request_started)
+def count_request(sender, **kwargs):
+    with _lock:
+        _counts['requests'] += 1
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    with _lock:
+        _counts[f'opened:{connection.alias}'] += 1
+
+
+def connection_stats():
+    """Requests served by this process and, per database, connections opened and the share of requests reusing one"""
+    with _lock:
+        counts = dict(_counts)
+    requests = counts.get('requests', 0)
+    databases = []
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        opened = counts.get(f'opened:{alias}', 0)
+        databases.append({
+            'alias': alias,
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+            'opened': opened,
+            # Connections opened outside requests (warm-up, commands) count too, so this is a lower bound
+            'reuse_rate': max(requests - opened, 0) / requests if requests else None,
+        })
+    return {'pid': os.getpid(), 'requests': requests, 'databases': databases}
+
+
+def reset_connection_stats():
+    with _lock:
+        _counts.clear()
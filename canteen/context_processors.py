@@ -0,0 +1,9 @@
+from .outlets import get_current_outlet, get_outlets
+
+
+def outlets(request):
+    """The outlet switcher in the navbar"""
+    return {
+        'outlets': get_outlets(),
+        'current_outlet': get_current_outlet(request),
+    }
@@ -1,7 +1,9 @@
 from django import forms
 from django.core.validators import MinValueValidator, MaxValueValidator
+import uuid
 from datetime import date, timedelta
 from .models import Review, PreOrder, PickupSlot
+from .slots import get_slot_loads, suggest_slot
 
 class ReviewForm(forms.ModelForm):
     class Meta:
@@ -15,6 +17,9 @@ class ReviewForm(forms.ModelForm):
         }
 
 class PreOrderForm(forms.ModelForm):
+    # Lets a double-click or a retried submit return the original order instead of a duplicate
+    idempotency_key = forms.CharField(widget=forms.HiddenInput, required=False, max_length=64)
+    
     class Meta:
         model = PreOrder
         fields = ['quantity', 'pickup_slot', 'date', 'special_instructions']
@@ -26,8 +31,12 @@ class PreOrderForm(forms.ModelForm):
                                                         'placeholder': 'Any special requests?'}),
         }
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, dish=None, **kwargs):
+        self.dish = dish
+        self.full_slot = None
         super().__init__(*args, **kwargs)
+        if not self.is_bound:
+            self.fields['idempotency_key'].initial = uuid.uuid4().hex
         # Set minimum date to tomorrow
         tomorrow = date.today() + timedelta(days=1)
         self.fields['date'].widget.attrs['min'] = tomorrow.strftime('%Y-%m-%d')
@@ -36,8 +45,30 @@ class PreOrderForm(forms.ModelForm):
         max_date = date.today() + timedelta(days=7)
         self.fields['date'].widget.attrs['max'] = max_date.strftime('%Y-%m-%d')
         
-        # Only show active pickup slots
-        self.fields['pickup_slot'].queryset = PickupSlot.objects.filter(is_active=True)
+        # Only show active pickup slots of the dish's outlet
+        slots = PickupSlot.objects.filter(is_active=True)
+        if dish is not None:
+            slots = slots.filter(canteen_id=dish.canteen_id)
+        self.fields['pickup_slot'].queryset = slots
+    
+    def show_slot_loads(self, day):
+        """Label slots with how busy they are on a date and preselect the suggested one"""
+        loads = get_slot_loads(day, self.dish.canteen_id if self.dish else None)
+        by_id = {load['id']: load for load in loads}
+        
+        def label(slot):
+            load = by_id.get(slot.id)
+            if load is None:
+                return str(slot)
+            if load['is_full']:
+                return f"{slot} (full)"
+            return f"{slot} ({load['orders']}/{load['max_orders']} booked)"
+        
+        self.fields['pickup_slot'].label_from_instance = label
+        suggestion = suggest_slot(day, self.dish, loads)
+        if suggestion and not self.is_bound:
+            self.fields['pickup_slot'].initial = suggestion['id']
+        return loads, suggestion
     
     def clean_date(self):
         selected_date = self.cleaned_data['date']
@@ -52,6 +83,28 @@ class PreOrderForm(forms.ModelForm):
         
         return selected_date
     
+    def clean(self):
+        cleaned_data = super().clean()
+        slot = cleaned_data.get('pickup_slot')
+        selected_date = cleaned_data.get('date')
+        if slot and selected_date:
+            # Count fresh rather than from the cached loads so a full slot is never overbooked
+            booked = PreOrder.objects.filter(
+                pickup_slot=slot, date=selected_date, status__in=PickupSlot.ACTIVE_ORDER_STATUSES
+            ).count()
+            if booked >= slot.max_orders:
+                self.full_slot = slot
+                message = "This pickup slot is full."
+                suggestion = suggest_slot(selected_date, self.dish)
+                if suggestion:
+                    message += f" {suggestion['label']} still has room."
+                self.add_error('pickup_slot', message)
+        return cleaned_data
+    
+    def can_join_waitlist(self):
+        """True when the chosen slot being full is the only thing wrong with the order"""
+        return self.full_slot is not None and list(self.errors) == ['pickup_slot']
+    
     def clean_quantity(self):
         quantity = self.cleaned_data['quantity']
         if quantity < 1:
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+
+def get_request_key(request, form_key=None):
+    """Idempotency key from the booking form's hidden field or an Idempotency-Key header"""
+    key = (form_key or request.headers.get('Idempotency-Key') or '').strip()
+    return key[:IDEMPOTENCY_KEY_MAX_LENGTH] or None
+
+
+def _expiry_cutoff():
+    return timezone.now() - timedelta(seconds=settings.CANTEEN_IDEMPOTENCY_TTL)
+
+
+def find_order(user, key):
+    """Return the order an earlier request with this key created, if it has not expired"""
+    if not key:
+        return None
+    record = (
+        IdempotencyKey.objects.filter(user=user, key=key, created_at__gte=_expiry_cutoff(), preorder__isnull=False)
+        .select_related('preorder')
+        .first()
+    )
+    return record.preorder if record else None
+
+
+def claim_key(user, key):
+    """Record a key inside the caller's transaction; a concurrent duplicate raises IntegrityError"""
+    IdempotencyKey.objects.filter(user=user, key=key, created_at__lt=_expiry_cutoff()).delete()
+    return IdempotencyKey.objects.create(user=user, key=key)
+
+
+def purge_expired_keys():
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=_expiry_cutoff()).delete()
+    return deleted
@@ -0,0 +1,109 @@
+import heapq
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+
+from .models import PreOrder
+
+
+def split_portions(quantities, max_portions):
+    """Pack orders of these quantities, in turn, into batches of at most max_portions.
+
+    Returns [{'portions', 'orders'}]; an order that spills over into the next
+    batch counts towards both, since both cook part of it.
+    """
+    pieces = []
+    space = 0
+    for quantity in quantities:
+        while quantity > 0:
+            if space == 0:
+                pieces.append({'portions': 0, 'orders': 0})
+                space = max_portions
+            portions = min(quantity, space)
+            pieces[-1]['portions'] += portions
+            pieces[-1]['orders'] += 1
+            quantity -= portions
+            space -= portions
+    return pieces
+
+
+def get_batches(day, canteen_id=None):
+    """Group a day's confirmed orders of an outlet into cooking batches per (slot, dish)"""
+    orders = PreOrder.objects.filter(date=day, status='confirmed')
+    if canteen_id is not None:
+        orders = orders.filter(canteen_id=canteen_id)
+    rows = (
+        orders
+        .values_list(
+            'pickup_slot_id', 'pickup_slot__start_time', 'dish_id', 'dish__name', 'dish__preparation_time', 'quantity',
+        )
+        .order_by('pickup_slot_id', 'dish_id', 'id')
+    )
+
+    max_portions = settings.CANTEEN_KITCHEN_BATCH_PORTIONS
+    batches = []
+    for (slot_id, start_time, dish_id, dish_name, preparation_time), group in groupby(rows, key=itemgetter(slice(5))):
+        deadline = datetime.combine(day, start_time)
+        # Large orders for one dish are split into several batches of at most max_portions
+        for piece in split_portions((row[5] for row in group), max_portions):
+            batches.append({
+                'dish_id': dish_id,
+                'dish_name': dish_name,
+                'slot_id': slot_id,
+                'portions': piece['portions'],
+                'orders': piece['orders'],
+                'duration': timedelta(minutes=preparation_time),
+                'deadline': deadline,
+            })
+    return batches
+
+
+def schedule_batches(batches, stations, opens_at):
+    """Assign batches to stations so each finishes as close to its pickup slot as possible.
+
+    Works backwards from the latest deadline: every batch goes to the station
+    that stays free the latest, and finishes at its deadline or when that
+    station's next batch starts, whichever is earlier. With a heap of station
+    free times this is O(n log s) for n batches and s stations.
+    """
+    # Latest deadline first; longer batches first when deadlines tie
+    ordered = sorted(batches, key=lambda batch: (batch['deadline'], batch['duration']), reverse=True)
+    # Max-heap of (seconds after opening until which a station is free); idle stations are free forever
+    free_until = [(-float('inf'), station) for station in range(1, stations + 1)]
+    heapq.heapify(free_until)
+
+    timeline = []
+    for batch in ordered:
+        negative_free, station = heapq.heappop(free_until)
+        end = batch['deadline']
+        if negative_free != -float('inf'):
+            end = min(end, opens_at + timedelta(seconds=-negative_free))
+        start = end - batch['duration']
+        heapq.heappush(free_until, (-(start - opens_at).total_seconds(), station))
+        timeline.append(dict(
+            batch,
+            station=station,
+            start=start,
+            end=end,
+            early_start=start < opens_at,
+        ))
+
+    timeline.sort(key=lambda batch: (batch['start'], batch['station']))
+    return timeline
+
+
+def build_kitchen_schedule(day, canteen_id=None):
+    """Kitchen timeline of an outlet for a date with a short summary"""
+    opens_at = datetime.combine(day, settings.CANTEEN_KITCHEN_OPENS_AT)
+    timeline = schedule_batches(get_batches(day, canteen_id), settings.CANTEEN_KITCHEN_STATIONS, opens_at)
+    return {
+        'date': day,
+        'stations': settings.CANTEEN_KITCHEN_STATIONS,
+        'timeline': timeline,
+        'batch_count': len(timeline),
+        'portion_count': sum(batch['portions'] for batch in timeline),
+        'early_starts': sum(1 for batch in timeline if batch['early_start']),
+        'first_start': timeline[0]['start'] if timeline else None,
+    }
@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from canteen.idempotency import purge_expired_keys
+from canteen.models import ArchivedPreOrder, DailyOrderRollup, PreOrder
+
+ARCHIVABLE_STATUSES = ['picked', 'cancelled']
+ARCHIVED_FIELDS = [
+    'id', 'canteen_id', 'user_id', 'dish_id', 'quantity', 'pickup_slot_id', 'date', 'status',
+    'special_instructions', 'total_amount', 'order_number', 'created_at', 'updated_at',
+]
+
+
+class Command(BaseCommand):
+    help = 'Move picked up and cancelled orders older than N days into the archive table (run daily from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Archive finished orders with a pickup date older than this')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Orders moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many orders would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = date.today() - timedelta(days=options['days'])
+        candidates = PreOrder.objects.filter(status__in=ARCHIVABLE_STATUSES, date__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} orders before {cutoff} would be archived')
+            return
+
+        started = perf_counter()
+        moved = 0
+        while True:
+            rows = list(candidates.order_by('id').values(*ARCHIVED_FIELDS)[:options['batch_size']])
+            if not rows:
+                break
+            self.archive_batch(rows)
+            moved += len(rows)
+            elapsed = perf_counter() - started
+            self.stdout.write(f'  Archived {moved} orders ({moved / max(elapsed, 1e-9):.0f} orders/s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} orders with a pickup date before {cutoff}'))
+        self.stdout.write(f'Purged {purge_expired_keys()} expired idempotency keys')
+
+    @transaction.atomic
+    def archive_batch(self, rows):
+        """Copy one batch into the archive, fold it into the rollups and delete it from the hot table"""
+        ids = [row.pop('id') for row in rows]
+        ArchivedPreOrder.objects.bulk_create([ArchivedPreOrder(**row) for row in rows])
+
+        totals = (
+            PreOrder.objects.filter(id__in=ids)
+            .values('date', 'dish_id', 'status')
+            .annotate(orders=Count('id'), items=Sum('quantity'), amount=Sum('total_amount'))
+            .order_by()
+        )
+        for group in totals:
+            updated = DailyOrderRollup.objects.filter(
+                date=group['date'], dish_id=group['dish_id'], status=group['status']
+            ).update(
+                order_count=F('order_count') + group['orders'],
+                item_count=F('item_count') + group['items'],
+                total_amount=F('total_amount') + group['amount'],
+            )
+            if not updated:
+                DailyOrderRollup.objects.create(
+                    date=group['date'],
+                    dish_id=group['dish_id'],
+                    status=group['status'],
+                    order_count=group['orders'],
+                    item_count=group['items'],
+                    total_amount=group['amount'],
+                )
+
+        PreOrder.objects.filter(id__in=ids).delete()
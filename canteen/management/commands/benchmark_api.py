@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from canteen.models import Dish
+
+
+class Command(BaseCommand):
+    help = 'Compare response time and size of the JSON API against the HTML menu and dish pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        dish = Dish.objects.filter(is_available=True).order_by('id').first()
+        if dish is None:
+            self.stdout.write(self.style.ERROR('No available dishes; run populate_sample_data first'))
+            return
+
+        client = Client()
+        endpoints = [
+            ('HTML menu', reverse('canteen:menu'), {}),
+            ('API menu', reverse('canteen:api_menu'), {}),
+            ('API menu (id,name,price)', reverse('canteen:api_menu') + '?fields=id,name,price', {}),
+            ('HTML dish detail', reverse('canteen:dish_detail', args=[dish.pk]), {}),
+            ('API dish detail', reverse('canteen:api_dish_detail', args=[dish.pk]), {}),
+        ]
+        # Revalidation with the ETag of the first response
+        etag = client.get(reverse('canteen:api_menu'))['ETag']
+        endpoints.append(('API menu (304)', reverse('canteen:api_menu'), {'HTTP_IF_NONE_MATCH': etag}))
+
+        self.stdout.write(f'{count} requests per endpoint')
+        for label, url, headers in endpoints:
+            client.get(url, **headers)  # Warm caches
+            size = 0
+            start = time.perf_counter()
+            for _ in range(count):
+                response = client.get(url, **headers)
+                size = len(response.content)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{label:<26} {response.status_code}  {elapsed * 1000 / count:7.2f} ms/request  {size:8d} bytes'
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
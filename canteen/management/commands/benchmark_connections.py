@@ -0,0 +1,75 @@
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from canteen.connections import connection_stats, reset_connection_stats
+
+# (label, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+MODES = [
+    ('New connection per request', 0, False),
+    ('Persistent + health checks', 60, True),
+    ('Persistent, no checks', 60, False),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark menu and dashboard latency with a new database connection per request and with persistent ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and mode')
+        parser.add_argument('--username', default='student', help='User the pages are requested as')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            self.stdout.write(self.style.ERROR(f'No user {options["username"]}; run populate_sample_data first'))
+            return
+
+        # The test client keeps connections open, so requests go through the real WSGI handler
+        client = Client()
+        client.force_login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        handler = WSGIHandler()
+
+        def get(path):
+            environ = {'PATH_INFO': path, 'HTTP_COOKIE': cookie}
+            setup_testing_defaults(environ)
+            response = handler(environ, lambda status, headers, exc_info=None: None)
+            b''.join(response)
+            response.close()  # Sends request_finished, which closes the connection unless it is kept
+
+        pages = [('Menu', reverse('canteen:menu')), ('Dashboard', reverse('canteen:dashboard'))]
+        original = {key: connection.settings_dict[key] for key in ['CONN_MAX_AGE', 'CONN_HEALTH_CHECKS']}
+        self.stdout.write(f'{count} requests per page as {user.username} on {connection.vendor}')
+        baseline = {}
+        try:
+            for label, max_age, health_checks in MODES:
+                connection.close()
+                connection.settings_dict.update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks)
+                for page, path in pages:
+                    get(path)  # Warm caches
+                    reset_connection_stats()
+                    start = time.perf_counter()
+                    for _ in range(count):
+                        get(path)
+                    ms = (time.perf_counter() - start) * 1000 / count
+                    stats = connection_stats()
+                    opened = next(db['opened'] for db in stats['databases'] if db['alias'] == connection.alias)
+                    baseline.setdefault(page, ms)
+                    self.stdout.write(
+                        f'{label:<28} {page:<10} {ms:7.3f} ms/request  {opened:5d} connections opened'
+                        f'  {baseline[page] - ms:+7.3f} ms saved'
+                    )
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,64 @@
+import random
+import string
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from canteen.models import PreOrder
+from canteen.qr import encode, get_order_qr_svg, order_qr_cache_key, to_svg
+
+
+class Command(BaseCommand):
+    help = 'Benchmark batch QR code generation for order numbers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Number of order QR codes to generate')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for generated order numbers')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        rng = random.Random(options['seed'])
+        order_numbers = [
+            ''.join(rng.choices(string.ascii_uppercase + string.digits, k=8))
+            for _ in range(count)
+        ]
+
+        self.stdout.write(f'Encoding {count} order QR codes...')
+
+        start = time.perf_counter()
+        matrices = [encode(f'{PreOrder.QR_PAYLOAD_PREFIX}{number}') for number in order_numbers]
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for matrix in matrices:
+            to_svg(matrix)
+        render_time = time.perf_counter() - start
+
+        # Cold cache: every lookup encodes and stores, warm cache: every lookup is a hit
+        for number in order_numbers:
+            cache.delete(order_qr_cache_key(number))
+        start = time.perf_counter()
+        for number in order_numbers:
+            get_order_qr_svg(number)
+        cold_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for number in order_numbers:
+            get_order_qr_svg(number)
+        warm_time = time.perf_counter() - start
+
+        for number in order_numbers:
+            cache.delete(order_qr_cache_key(number))
+
+        for label, elapsed in [
+            ('Encode', encode_time),
+            ('Render SVG', render_time),
+            ('Cached lookup (cold)', cold_time),
+            ('Cached lookup (warm)', warm_time),
+        ]:
+            self.stdout.write(
+                f'{label:<22} {elapsed * 1000:9.1f} ms total  '
+                f'{elapsed * 1000 / count:7.3f} ms/code  {count / elapsed:9.0f} codes/s'
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
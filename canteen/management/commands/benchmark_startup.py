@@ -0,0 +1,73 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+# Runs in a fresh interpreter: imports the WSGI application, then requests each path twice
+WORKER_SCRIPT = '''
+import json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+start = time.perf_counter()
+from campus_canteen.wsgi import application
+result = {'import_ms': (time.perf_counter() - start) * 1000, 'requests': []}
+
+for path in sys.argv[1:]:
+    timings = []
+    for _ in range(2):
+        environ = {'PATH_INFO': path}
+        setup_testing_defaults(environ)
+        statuses = []
+        start = time.perf_counter()
+        response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b''.join(response)
+        response.close()
+        timings.append((time.perf_counter() - start) * 1000)
+    result['requests'].append({'path': path, 'status': statuses[0], 'first_ms': timings[0], 'second_ms': timings[1]})
+print(json.dumps(result))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Benchmark worker startup: import time and first-request latency with and without warm-up'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Fresh worker processes per measurement')
+
+    def start_worker(self, paths, warmup):
+        env = dict(
+            os.environ,
+            DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE,
+            PYTHONPATH=os.pathsep.join(sys.path),
+            CANTEEN_WARMUP=str(warmup),
+        )
+        completed = subprocess.run(
+            [sys.executable, '-c', WORKER_SCRIPT, *paths],
+            env=env, cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        paths = [reverse('canteen:menu'), reverse('canteen:api_menu'), reverse('accounts:login')]
+        self.stdout.write(f'{runs} fresh workers per measurement, median times')
+
+        for label, warmup in [('Without warm-up', False), ('With warm-up', True)]:
+            results = [self.start_worker(paths, warmup) for _ in range(runs)]
+            import_ms = statistics.median(result['import_ms'] for result in results)
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(f'  {"Import wsgi.py":<26} {import_ms:8.1f} ms')
+            for i, path in enumerate(paths):
+                first_ms = statistics.median(result['requests'][i]['first_ms'] for result in results)
+                second_ms = statistics.median(result['requests'][i]['second_ms'] for result in results)
+                status = results[0]['requests'][i]['status']
+                self.stdout.write(
+                    f'  {path:<26} {first_ms:8.1f} ms first request  {second_ms:7.1f} ms second  ({status})'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
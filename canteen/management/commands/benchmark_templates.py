@@ -0,0 +1,75 @@
+import time
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management.base import BaseCommand
+from django.template import Context, Template
+from django.test import Client
+from django.urls import reverse
+
+from canteen.menu import MENU_PER_PAGE, get_published_menu
+from canteen.outlets import get_default_outlet
+from canteen.profiling import record_template_timings
+
+STAR_LOOP = Template(
+    '{% for dish in dishes %}{% for i in "12345" %}{% if i|add:0 <= dish.average_rating %}'
+    '<i class="fas fa-star"></i>{% else %}<i class="far fa-star"></i>{% endif %}{% endfor %}{% endfor %}'
+)
+STAR_TAG = Template(
+    '{% load canteen_tags %}{% for dish in dishes %}{% star_rating dish.average_rating %}{% endfor %}'
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark template render time of menu pages with cold and warm dish card fragments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Renders per measurement')
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        # The client below browses the default outlet
+        outlet = get_default_outlet()
+        menu = get_published_menu(outlet['id'] if outlet else None)
+        dishes = menu['orderings']['name']
+        if not dishes:
+            self.stdout.write(self.style.ERROR('No available dishes; run populate_sample_data first'))
+            return
+
+        pages = (len(dishes) + MENU_PER_PAGE - 1) // MENU_PER_PAGE
+        self.stdout.write(f'{len(dishes)} dishes over {pages} menu pages, {count} renders per measurement')
+
+        client = Client()
+        url = reverse('canteen:menu')
+        client.get(url)  # Warm the menu snapshot and stock levels
+
+        def clear_cards():
+            keys = []
+            for dish in dishes:
+                keys.append(make_template_fragment_key('dish_card', [dish['id'], dish['card_version']]))
+                keys.append(make_template_fragment_key('dish_card_actions', [dish['id'], False]))
+            cache.delete_many(keys)
+
+        for label, cold in [('Menu page, cold cards', True), ('Menu page, cached cards', False)]:
+            render_ms = 0
+            start = time.perf_counter()
+            for i in range(count):
+                if cold:
+                    clear_cards()
+                with record_template_timings() as timings:
+                    client.get(url, {'page': i % pages + 1})
+                render_ms += sum(timing['ms'] for timing in timings if timing['depth'] == 0)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{label:<26} {render_ms / count:7.2f} ms render/page  {elapsed * 1000 / count:7.2f} ms/request'
+            )
+
+        context = Context({'dishes': dishes[:MENU_PER_PAGE]})
+        for label, template in [('Star loop (12 dishes)', STAR_LOOP), ('star_rating tag (12 dishes)', STAR_TAG)]:
+            start = time.perf_counter()
+            for _ in range(count):
+                template.render(context)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{label:<26} {elapsed * 1000 / count:7.3f} ms/render')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
@@ -0,0 +1,19 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from canteen.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Precompute dish-to-dish and per-user recommendations from order and review history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=8, help='Recommendations to keep per dish and per user')
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        dish_rows, user_rows = build_recommendations(k=options['top'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {dish_rows} dish and {user_rows} user recommendations in {perf_counter() - started:.1f}s'
+        ))
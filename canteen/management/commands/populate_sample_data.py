@@ -1,15 +1,54 @@
+import random
+from contextlib import contextmanager
+from time import perf_counter
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from canteen.models import Category, Dish, PickupSlot
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from canteen.menu import publish_menu
+from canteen.models import ArchivedPreOrder, Canteen, Category, Dish, PickupSlot, PreOrder, Review
 from accounts.models import UserProfile
-from datetime import time
+
+LOAD_TEST_PREFIX = 'loadtest'
+
+
+@contextmanager
+def explicit_timestamps(model, field_names):
+    """Switch off auto_now/auto_now_add on these fields so inserts keep the values already set"""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
 
 class Command(BaseCommand):
-    help = 'Populate database with sample data for testing'
+    help = 'Populate database with sample data for testing, optionally bulk-loading synthetic data at scale'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=0, help='Number of synthetic students to create')
+        parser.add_argument('--dishes', type=int, default=0, help='Number of synthetic dishes to create')
+        parser.add_argument('--days', type=int, default=0, help='Days of order history to generate, ending today')
+        parser.add_argument('--orders-per-day', type=int, default=0, help='Orders to generate for each day of history')
+        parser.add_argument('--reviews-per-dish', type=int, default=0, help='Reviews to generate for each dish')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch and transaction')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, the same seed gives the same data')
     
     def handle(self, *args, **options):
         self.stdout.write('Creating sample data...')
         
+        # Everything, including the bulk load, goes into the main outlet
+        self.canteen, _ = Canteen.objects.get_or_create(slug='main', defaults={'name': 'Main Canteen'})
+        
         # Create categories
         categories = [
             {'name': 'Main Course', 'description': 'Full meals and main dishes'},
@@ -37,6 +76,7 @@ class Command(BaseCommand):
         
         for start_time, end_time in pickup_slots:
             slot, created = PickupSlot.objects.get_or_create(
+                canteen=self.canteen,
                 start_time=start_time,
                 end_time=end_time,
                 defaults={'max_orders': 50}
@@ -173,7 +213,7 @@ class Command(BaseCommand):
         for dish_data in sample_dishes:
             dish, created = Dish.objects.get_or_create(
                 name=dish_data['name'],
-                defaults=dish_data
+                defaults=dict(dish_data, canteen=self.canteen)
             )
             if created:
                 self.stdout.write(f'Created dish: {dish.name}')
@@ -229,4 +269,173 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('You can now login with:'))
         self.stdout.write('Admin: admin/admin123')
         self.stdout.write('Staff: staff/staff123') 
-        self.stdout.write('Student: student/student123')
\ No newline at end of file
+        self.stdout.write('Student: student/student123')
+        
+        if any(options[name] for name in ('users', 'dishes', 'days', 'orders_per_day', 'reviews_per_dish')):
+            self.bulk_load(options)
+    
+    def bulk_load(self, options):
+        """Generate deterministic synthetic data in batched bulk_create transactions"""
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = perf_counter()
+        total_rows = 0
+        
+        if options['users']:
+            total_rows += self.bulk_load_users(options['users'])
+        if options['dishes']:
+            total_rows += self.bulk_load_dishes(options['dishes'])
+        
+        user_ids = list(User.objects.filter(userprofile__role='student').values_list('id', flat=True))
+        dishes = list(Dish.objects.filter(canteen=self.canteen).values_list('id', 'price'))
+        slot_ids = list(PickupSlot.objects.filter(canteen=self.canteen, is_active=True).values_list('id', flat=True))
+        
+        if options['days'] and options['orders_per_day']:
+            if not (user_ids and dishes and slot_ids):
+                self.stdout.write(self.style.ERROR('Orders need at least one student, dish and pickup slot'))
+            else:
+                total_rows += self.bulk_load_orders(options['days'], options['orders_per_day'], user_ids, dishes, slot_ids)
+        
+        if options['reviews_per_dish'] and user_ids and dishes:
+            total_rows += self.bulk_load_reviews(options['reviews_per_dish'], user_ids, dishes)
+        
+        # bulk_create skips the signals that republish the menu
+        publish_menu()
+        
+        elapsed = perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Bulk load finished: {total_rows} rows in {elapsed:.1f}s ({total_rows / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
+    
+    def write_batches(self, label, model, objects, total, ignore_conflicts=False, backdate=()):
+        """Insert objects from a generator in fixed-size batches, one transaction per batch.
+        
+        backdate names auto_now/auto_now_add fields whose generated values are
+        inserted as they are instead of being stamped with the current time.
+        """
+        started = perf_counter()
+        written = 0
+        batch = []
+        
+        def flush():
+            nonlocal written
+            with transaction.atomic(), explicit_timestamps(model, backdate):
+                model.objects.bulk_create(batch, batch_size=self.batch_size, ignore_conflicts=ignore_conflicts)
+            written += len(batch)
+            batch.clear()
+            elapsed = perf_counter() - started
+            self.stdout.write(f'  {label}: {written}/{total} ({written / max(elapsed, 1e-9):.0f} rows/s)')
+        
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+        return written
+    
+    def bulk_load_users(self, count):
+        start = User.objects.filter(username__startswith=f'{LOAD_TEST_PREFIX}_student_').count()
+        # Hashing is the expensive part of creating users, so every synthetic student shares one hash
+        password = make_password('student123')
+        usernames = [f'{LOAD_TEST_PREFIX}_student_{n:07d}' for n in range(start, start + count)]
+        
+        written = self.write_batches('Users', User, (
+            User(username=username, email=f'{username}@college.edu', password=password,
+                 first_name='Load', last_name=f'Student {username[-7:]}')
+            for username in usernames
+        ), count)
+        
+        user_ids = User.objects.filter(username__in=usernames).values_list('id', 'username')
+        written += self.write_batches('Profiles', UserProfile, (
+            UserProfile(user_id=user_id, role='student', student_id=f'LT{username[-7:]}')
+            for user_id, username in user_ids.iterator(chunk_size=self.batch_size)
+        ), count)
+        return written
+    
+    def bulk_load_dishes(self, count):
+        categories = list(Category.objects.values_list('id', 'name'))
+        dish_types = [choice for choice, _ in Dish.DISH_TYPE_CHOICES]
+        start = Dish.objects.filter(name__startswith='Load Test Dish').count()
+        
+        def dishes():
+            for n in range(start, start + count):
+                category_id, category_name = self.rng.choice(categories)
+                yield Dish(
+                    canteen_id=self.canteen.id,
+                    name=f'Load Test Dish {n:05d}',
+                    description=f'Synthetic {category_name.lower()} item for load testing',
+                    category_id=category_id,
+                    dish_type=self.rng.choice(dish_types),
+                    price=Decimal(self.rng.randrange(1000, 25000)) / 100,
+                    ingredients='Synthetic ingredients',
+                    preparation_time=self.rng.randint(2, 40),
+                    is_featured=self.rng.random() < 0.05,
+                )
+        
+        return self.write_batches('Dishes', Dish, dishes(), count)
+    
+    def last_load_order_number(self):
+        """Highest LT order number used so far, archived orders included"""
+        numbers = [
+            model.objects.filter(order_number__regex=r'^LT[0-9]{10}$').aggregate(top=Max('order_number'))['top']
+            for model in [PreOrder, ArchivedPreOrder]
+        ]
+        return max((int(number[2:]) for number in numbers if number), default=0)
+    
+    def bulk_load_orders(self, days, orders_per_day, user_ids, dishes, slot_ids):
+        today = date.today()
+        # Continue from the highest number used, not the row count, so archived or deleted orders never cause a collision
+        sequence = self.last_load_order_number()
+        total = days * orders_per_day
+        
+        def orders():
+            nonlocal sequence
+            for day_offset in range(days - 1, -1, -1):
+                day = today - timedelta(days=day_offset)
+                for _ in range(orders_per_day):
+                    dish_id, price = self.rng.choice(dishes)
+                    quantity = self.rng.randint(1, 3)
+                    if day_offset:
+                        status = 'picked' if self.rng.random() < 0.92 else 'cancelled'
+                    else:
+                        status = self.rng.choice(['pending', 'confirmed', 'ready', 'picked'])
+                    sequence += 1
+                    # Booked one or two days ahead; past orders last changed at pickup
+                    created_at = timezone.make_aware(datetime.combine(
+                        day - timedelta(days=self.rng.randint(1, 2)), time(8)
+                    )) + timedelta(seconds=self.rng.randint(0, 14 * 60 * 60))
+                    updated_at = timezone.make_aware(datetime.combine(day, time(13))) if day_offset else created_at
+                    # bulk_create skips PreOrder.save(), so fill in what it would compute
+                    yield PreOrder(
+                        canteen_id=self.canteen.id,
+                        user_id=self.rng.choice(user_ids),
+                        dish_id=dish_id,
+                        quantity=quantity,
+                        pickup_slot_id=self.rng.choice(slot_ids),
+                        date=day,
+                        status=status,
+                        total_amount=price * quantity,
+                        order_number=f'LT{sequence:010d}',
+                        created_at=created_at,
+                        updated_at=updated_at,
+                    )
+        
+        return self.write_batches('Orders', PreOrder, orders(), total, backdate=['created_at', 'updated_at'])
+    
+    def bulk_load_reviews(self, reviews_per_dish, user_ids, dishes):
+        per_dish = min(reviews_per_dish, len(user_ids))
+        comments = ['', 'Tasty!', 'Good value', 'Too spicy for me', 'Could be warmer', 'Will order again']
+        
+        def reviews():
+            for dish_id, _ in dishes:
+                for user_id in self.rng.sample(user_ids, per_dish):
+                    yield Review(
+                        dish_id=dish_id,
+                        user_id=user_id,
+                        rating=self.rng.choices([1, 2, 3, 4, 5], weights=[1, 2, 4, 6, 5])[0],
+                        comment=self.rng.choice(comments),
+                    )
+        
+        # Existing (dish, user) pairs are skipped rather than failing the whole batch
+        return self.write_batches('Reviews', Review, reviews(), per_dish * len(dishes), ignore_conflicts=True)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from canteen.menu import get_published_menu, publish_menu
+from canteen.outlets import get_outlets
+
+
+class Command(BaseCommand):
+    help = 'Publish the current menu of every outlet so every process serves fresh snapshots'
+
+    def handle(self, *args, **options):
+        version = publish_menu()
+        for outlet in get_outlets():
+            menu = get_published_menu(outlet['id'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Published {outlet["name"]} menu {version[:8]} with {menu["dish_count"]} dishes in {len(menu["categories"])} categories'
+            ))
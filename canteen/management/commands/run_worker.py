@@ -0,0 +1,54 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from canteen.tasks import claim_tasks, purge_finished_tasks, recover_stale_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks, retrying failures with exponential backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no task is due instead of polling')
+        parser.add_argument('--batch-size', type=int, default=20, help='Tasks claimed per poll')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--purge-days', type=int, default=7, help='Delete finished tasks older than this')
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Worker {worker_id} started')
+        self.stdout.write(f'Purged {purge_finished_tasks(options["purge_days"])} finished tasks')
+
+        done = failed = 0
+        try:
+            while True:
+                # Like a request, each poll drops a connection that is too old or fails its health check
+                close_old_connections()
+                recovered = recover_stale_tasks()
+                if recovered:
+                    self.stdout.write(self.style.WARNING(f'Recovered {recovered} stale tasks'))
+
+                tasks = claim_tasks(worker_id, options['batch_size'])
+                for background_task in tasks:
+                    started = time.perf_counter()
+                    if run_task(background_task):
+                        done += 1
+                        self.stdout.write(f'  {background_task.name} done in {(time.perf_counter() - started) * 1000:.0f} ms')
+                    else:
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(
+                            f'  {background_task.name} failed (attempt {background_task.attempts}/{background_task.max_attempts}), '
+                            f'{"retrying at " + background_task.run_at.isoformat() if background_task.status == "pending" else "giving up"}'
+                        ))
+
+                if not tasks:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping worker')
+
+        self.stdout.write(self.style.SUCCESS(f'Worker finished: {done} done, {failed} failed'))
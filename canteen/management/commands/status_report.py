@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from canteen.audit import PERCENTILES, time_in_status_report
+from canteen.models import Dish, PickupSlot
+
+
+def _minutes(seconds):
+    return f'{seconds / 60:7.1f}' if seconds is not None else '      -'
+
+
+class Command(BaseCommand):
+    help = 'Report percentiles of time orders spend in each status, per dish and per pickup slot'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Only include status changes from the last N days')
+        parser.add_argument('--by', choices=['dish', 'slot'], default='dish', help='Group by dish or pickup slot')
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+        rows = time_in_status_report(since, group_by=options['by'])
+        if options['by'] == 'dish':
+            names = dict(Dish.objects.values_list('id', 'name'))
+        else:
+            names = {slot.id: str(slot) for slot in PickupSlot.objects.all()}
+
+        header = f'{options["by"].title():<28} {"Status":<10} {"Count":>6} {"Mean":>7}' + ''.join(f' {"p" + str(p):>7}' for p in PERCENTILES)
+        self.stdout.write(f'Minutes spent in each status since {since:%Y-%m-%d}')
+        self.stdout.write(header)
+        for row in rows:
+            self.stdout.write(
+                f'{names.get(row["group_id"], row["group_id"])!s:<28.28} {row["from_status"]:<10} {row["transitions"]:>6} '
+                f'{_minutes(row["mean"])}' + ''.join(f' {_minutes(row[f"p{p}"])}' for p in PERCENTILES)
+            )
+        if not rows:
+            self.stdout.write('No status changes recorded in this period')
@@ -0,0 +1,186 @@
+import uuid
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, FloatField, Max, Q, Value
+from django.db.models.functions import Coalesce
+
+from .models import Category, Dish
+
+MENU_PER_PAGE = 12
+
+# Keyset orderings for each sort option; each ends with the unique id
+MENU_ORDERINGS = {
+    'name': ('name', 'id'),
+    'price': ('price', 'id'),
+    'rating': ('-avg_rating', 'id'),
+}
+DEFAULT_MENU_SORT = 'name'
+
+MENU_VERSION_KEY = 'canteen:menu:version'  # Bumped by changes that touch every outlet's menu
+MENU_REMOVED_KEY = 'canteen:menu:removed'  # When a dish last left an outlet's menu
+CARD_CACHE_TIMEOUT = 60 * 60 * 24  # Card fragments are keyed by card_version, so stale ones just expire
+
+# This process's copy of each outlet's published menu and the version it was built from
+_published_menus = {}
+
+
+def filter_dishes(dishes, search_query='', category_filter='', dish_type_filter=''):
+    """Apply the menu page's search, category and type filters to a Dish queryset"""
+    if search_query:
+        dishes = dishes.filter(
+            Q(name__icontains=search_query) |
+            Q(description__icontains=search_query) |
+            Q(ingredients__icontains=search_query)
+        )
+    if category_filter:
+        dishes = dishes.filter(category__id=category_filter)
+    if dish_type_filter:
+        dishes = dishes.filter(dish_type=dish_type_filter)
+    return dishes
+
+
+def sort_dishes(dishes, sort_by):
+    """Order dishes for a sort option, returning (queryset, ordering)"""
+    if sort_by not in MENU_ORDERINGS:
+        sort_by = DEFAULT_MENU_SORT
+    if sort_by == 'rating':
+        dishes = dishes.annotate(avg_rating=Coalesce(Avg('review__rating'), Value(0.0), output_field=FloatField()))
+    ordering = MENU_ORDERINGS[sort_by]
+    return dishes.order_by(*ordering), ordering
+
+
+def outlet_dishes(canteen_id=None):
+    """Dishes of one outlet, or of every outlet when canteen_id is None"""
+    dishes = Dish.objects.all()
+    if canteen_id is not None:
+        dishes = dishes.filter(canteen_id=canteen_id)
+    return dishes
+
+
+def available_dishes(canteen_id=None):
+    return outlet_dishes(canteen_id).filter(is_available=True)
+
+
+def changes_version(updated_at):
+    """Sync version for the newest Dish.updated_at a client has seen"""
+    return f'{updated_at.timestamp():.6f}' if updated_at else '0'
+
+
+def parse_changes_version(version):
+    """The time behind a sync version, raising ValueError for a malformed one"""
+    return datetime.fromtimestamp(float(version), tz=timezone.utc)
+
+
+def record_removal(canteen_id):
+    """Note that a dish just left an outlet's menu, so syncing clients are sent the ids still on it"""
+    cache.set(f'{MENU_REMOVED_KEY}:{canteen_id}', datetime.now(timezone.utc), None)
+
+
+def last_removal(canteen_id):
+    """When a dish last left an outlet's menu; after a cache flush, assume just now"""
+    key = f'{MENU_REMOVED_KEY}:{canteen_id}'
+    removed_at = cache.get(key)
+    if removed_at is None:
+        cache.add(key, datetime.now(timezone.utc), None)
+        removed_at = cache.get(key)
+    return removed_at
+
+
+def outlet_version_key(canteen_id):
+    return f'{MENU_VERSION_KEY}:{canteen_id}'
+
+
+def publish_menu(canteen_id=None):
+    """Mark one outlet's published menu stale, or every outlet's when canteen_id is None.
+
+    The version lives in the shared cache (settings.CACHES), so every process
+    rebuilds its copy on the next request for that outlet.
+    """
+    version = uuid.uuid4().hex
+    cache.set(MENU_VERSION_KEY if canteen_id is None else outlet_version_key(canteen_id), version, None)
+    return version
+
+
+def _cached_version(key):
+    version = cache.get(key)
+    if version is None:
+        # First request after a cache flush: agree on one version across processes
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def _menu_version(canteen_id):
+    return f'{_cached_version(MENU_VERSION_KEY)}:{_cached_version(outlet_version_key(canteen_id))}'
+
+
+def build_menu(canteen_id=None):
+    """Snapshot an outlet's available dishes with ratings, categories and presorted orderings"""
+    dishes = []
+    rows = (
+        available_dishes(canteen_id)
+        .annotate(avg_rating=Avg('review__rating'), review_count=Count('review'))
+        .values('id', 'name', 'description', 'ingredients', 'category_id', 'category__name', 'dish_type',
+                'price', 'image', 'is_featured', 'preparation_time', 'updated_at', 'avg_rating', 'review_count')
+    )
+    for row in rows:
+        image = row['image']
+        dishes.append({
+            'id': row['id'],
+            'name': row['name'],
+            'description': row['description'],
+            'category_id': row['category_id'],
+            'category_name': row['category__name'],
+            'dish_type': row['dish_type'],
+            'price': row['price'],
+            'image_url': Dish.image.field.storage.url(image) if image else '',
+            'is_featured': row['is_featured'],
+            'is_available': True,
+            'preparation_time': row['preparation_time'],
+            'average_rating': round(row['avg_rating'], 1) if row['avg_rating'] is not None else 0,
+            'total_reviews': row['review_count'],
+            'search_text': '\n'.join([row['name'], row['description'], row['ingredients']]).casefold(),
+            'rating_key': row['avg_rating'] or 0.0,
+            # Changes whenever the dish is edited or its rating moves, for the card fragment cache
+            'card_version': f"{row['updated_at'].timestamp():.6f}-{row['review_count']}-{row['avg_rating'] or 0}",
+        })
+
+    orderings = {
+        'name': sorted(dishes, key=lambda dish: (dish['name'], dish['id'])),
+        'price': sorted(dishes, key=lambda dish: (dish['price'], dish['id'])),
+        'rating': sorted(dishes, key=lambda dish: (-dish['rating_key'], dish['id'])),
+    }
+    categories = list(Category.objects.filter(is_active=True).values('id', 'name'))
+    # Lets a page served from a service worker cache ask for the dishes changed since it was built
+    changed_at = outlet_dishes(canteen_id).aggregate(changed_at=Max('updated_at'))['changed_at']
+    return {
+        'orderings': orderings,
+        'categories': categories,
+        'dish_count': len(dishes),
+        'changes_version': changes_version(changed_at),
+    }
+
+
+def get_published_menu(canteen_id=None):
+    """This process's snapshot of an outlet's menu, rebuilt only when its published version changes"""
+    version = _menu_version(canteen_id)
+    published = _published_menus.get(canteen_id)
+    if published is None or published['version'] != version:
+        # Build first, then swap, so concurrent requests never see a half-built menu
+        published = {'version': version, 'menu': build_menu(canteen_id)}
+        _published_menus[canteen_id] = published
+    return published['menu']
+
+
+def search_menu(menu, search_query='', category_filter='', dish_type_filter='', sort_by=DEFAULT_MENU_SORT):
+    """Filter a presorted snapshot ordering in memory; the order is kept, so no sort is needed"""
+    dishes = menu['orderings'].get(sort_by) or menu['orderings'][DEFAULT_MENU_SORT]
+    if search_query:
+        needle = search_query.casefold()
+        dishes = [dish for dish in dishes if needle in dish['search_text']]
+    if category_filter:
+        dishes = [dish for dish in dishes if str(dish['category_id']) == category_filter]
+    if dish_type_filter:
+        dishes = [dish for dish in dishes if dish['dish_type'] == dish_type_filter]
+    return dishes
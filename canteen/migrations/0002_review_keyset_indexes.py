@@ -0,0 +1,27 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['dish', '-created_at', '-id'], name='review_dish_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['dish', '-rating', '-created_at', '-id'], name='review_dish_highest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['dish', 'rating', '-created_at', '-id'], name='review_dish_lowest_idx'),
+        ),
+    ]
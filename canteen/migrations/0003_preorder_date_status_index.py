@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0002_review_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(fields=['date', 'status', 'pickup_slot'], name='preorder_date_status_idx'),
+        ),
+    ]
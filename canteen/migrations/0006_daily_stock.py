@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0005_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(help_text='Portions prepared for this date')),
+                ('remaining', models.PositiveIntegerField(help_text='Portions not yet booked')),
+                ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stock', to='canteen.dish')),
+            ],
+            options={
+                'ordering': ['date', 'dish'],
+                'indexes': [models.Index(fields=['date', 'dish'], name='dailystock_date_dish_idx')],
+                'unique_together': {('dish', 'date')},
+            },
+        ),
+    ]
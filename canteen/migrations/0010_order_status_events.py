@@ -0,0 +1,37 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:34
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0009_notification_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('preorder_id', models.BigIntegerField()),
+                ('order_number', models.CharField(max_length=20)),
+                ('pickup_date', models.DateField()),
+                ('from_status', models.CharField(blank=True, max_length=10)),
+                ('to_status', models.CharField(max_length=10)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('seconds_in_previous', models.PositiveIntegerField(blank=True, help_text='Time spent in from_status', null=True)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('dish', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='canteen.dish')),
+                ('pickup_slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='canteen.pickupslot')),
+            ],
+            options={
+                'ordering': ['changed_at'],
+                'indexes': [models.Index(fields=['preorder_id', 'changed_at'], name='statusevent_order_idx'), models.Index(fields=['changed_at', 'from_status'], name='statusevent_changed_idx')],
+            },
+        ),
+    ]
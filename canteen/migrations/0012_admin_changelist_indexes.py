@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0011_waitlist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(fields=['-created_at', '-id'], name='preorder_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='review_newest_idx'),
+        ),
+    ]
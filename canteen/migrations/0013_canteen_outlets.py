@@ -0,0 +1,54 @@
+# Generated by Django 5.0.6 on 2026-10-19 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0012_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Canteen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(unique=True)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='dish',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+        migrations.AddField(
+            model_name='pickupslot',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+        migrations.AddField(
+            model_name='preorder',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['canteen', 'is_available', 'name'], name='dish_outlet_menu_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickupslot',
+            index=models.Index(fields=['canteen', 'is_active', 'start_time'], name='pickupslot_outlet_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='preorder',
+            index=models.Index(fields=['canteen', 'date', 'status', 'pickup_slot'], name='preorder_outlet_day_idx'),
+        ),
+    ]
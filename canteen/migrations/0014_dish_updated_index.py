@@ -0,0 +1,17 @@
+# Generated by Django 5.0.6 on 2026-10-19 00:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0013_canteen_outlets'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['canteen', 'updated_at'], name='dish_outlet_updated_idx'),
+        ),
+    ]
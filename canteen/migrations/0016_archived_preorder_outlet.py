@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-19 02:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0015_notification_backoff'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpreorder',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedpreorder',
+            index=models.Index(fields=['canteen', 'date'], name='archived_outlet_day_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-19 03:10
+
+from django.db import migrations
+
+
+def assign_main_canteen(apps, schema_editor):
+    """Put everything that existed before outlets into one outlet"""
+    Canteen = apps.get_model('canteen', 'Canteen')
+    models = [apps.get_model('canteen', model_name) for model_name in ['Dish', 'PickupSlot', 'PreOrder']]
+    if not any(model.objects.filter(canteen__isnull=True).exists() for model in models):
+        return
+    main, _ = Canteen.objects.get_or_create(slug='main', defaults={'name': 'Main Canteen'})
+    for model in models:
+        model.objects.filter(canteen__isnull=True).update(canteen=main)
+
+
+def assign_dish_canteen(apps, schema_editor):
+    """Archived orders belong to the outlet of their dish"""
+    ArchivedPreOrder = apps.get_model('canteen', 'ArchivedPreOrder')
+    Dish = apps.get_model('canteen', 'Dish')
+    for canteen_id in Dish.objects.values_list('canteen_id', flat=True).distinct():
+        ArchivedPreOrder.objects.filter(canteen__isnull=True, dish__canteen_id=canteen_id).update(canteen_id=canteen_id)
+
+
+class Migration(migrations.Migration):
+    # Data only: PostgreSQL refuses to alter a table with pending trigger events
+    # in the same transaction, so the columns become NOT NULL in 0018
+
+    dependencies = [
+        ('canteen', '0016_archived_preorder_outlet'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_main_canteen, migrations.RunPython.noop),
+        migrations.RunPython(assign_dish_canteen, migrations.RunPython.noop),
+    ]
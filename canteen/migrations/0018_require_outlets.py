@@ -0,0 +1,34 @@
+# Generated by Django 5.0.6 on 2026-10-19 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('canteen', '0017_assign_outlets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dish',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+        migrations.AlterField(
+            model_name='pickupslot',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+        migrations.AlterField(
+            model_name='preorder',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+        migrations.AlterField(
+            model_name='archivedpreorder',
+            name='canteen',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='canteen.canteen'),
+        ),
+    ]
@@ -2,8 +2,22 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.urls import reverse
+from django.utils import timezone
 from datetime import datetime, time
 
+class Canteen(models.Model):
+    """A campus outlet; dishes, pickup slots and orders each belong to one"""
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(unique=True)
+    location = models.CharField(max_length=200, blank=True)
+    is_active = models.BooleanField(default=True)
+    
+    class Meta:
+        ordering = ['id']
+    
+    def __str__(self):
+        return self.name
+
 class Category(models.Model):
     name = models.CharField(max_length=50, unique=True)
     description = models.TextField(blank=True)
@@ -16,13 +30,21 @@ class Category(models.Model):
         return self.name
 
 class PickupSlot(models.Model):
+    # Not indexed on its own: pickupslot_outlet_idx leads with it
+    canteen = models.ForeignKey(Canteen, on_delete=models.CASCADE, db_index=False)
     start_time = models.TimeField()
     end_time = models.TimeField()
     is_active = models.BooleanField(default=True)
     max_orders = models.PositiveIntegerField(default=50, help_text="Maximum orders for this slot")
     
+    # Orders that still take up room in a slot
+    ACTIVE_ORDER_STATUSES = ['pending', 'confirmed']
+    
     class Meta:
         ordering = ['start_time']
+        indexes = [
+            models.Index(fields=['canteen', 'is_active', 'start_time'], name='pickupslot_outlet_idx'),
+        ]
     
     def __str__(self):
         return f"{self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')}"
@@ -32,7 +54,7 @@ class PickupSlot(models.Model):
         current_orders = PreOrder.objects.filter(
             pickup_slot=self,
             date=datetime.now().date(),
-            status__in=['pending', 'confirmed']
+            status__in=self.ACTIVE_ORDER_STATUSES
         ).count()
         return current_orders < self.max_orders
 
@@ -43,6 +65,7 @@ class Dish(models.Model):
         ('beverage', 'Beverage'),
     ]
     
+    canteen = models.ForeignKey(Canteen, on_delete=models.CASCADE, db_index=False)
     name = models.CharField(max_length=100)
     description = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
@@ -56,6 +79,14 @@ class Dish(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # An outlet's menu: available dishes by name
+            models.Index(fields=['canteen', 'is_available', 'name'], name='dish_outlet_menu_idx'),
+            # Delta sync of an outlet's menu (api/menu/changes/)
+            models.Index(fields=['canteen', 'updated_at'], name='dish_outlet_updated_idx'),
+        ]
+    
     def __str__(self):
         return self.name
     
@@ -87,6 +118,14 @@ class Review(models.Model):
     class Meta:
         unique_together = ('dish', 'user')  # One review per user per dish
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination on dish_detail (see canteen/reviews.py)
+            models.Index(fields=['dish', '-created_at', '-id'], name='review_dish_newest_idx'),
+            models.Index(fields=['dish', '-rating', '-created_at', '-id'], name='review_dish_highest_idx'),
+            models.Index(fields=['dish', 'rating', '-created_at', '-id'], name='review_dish_lowest_idx'),
+            # Admin changelist order and date_hierarchy
+            models.Index(fields=['-created_at', '-id'], name='review_newest_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.dish.name} ({self.rating}/5)"
@@ -100,6 +139,11 @@ class PreOrder(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Prefix of the payload encoded in order QR codes scanned at the pickup counter
+    QR_PAYLOAD_PREFIX = 'CANTEEN:'
+    
+    # Copied from the dish on save so outlet queries filter on the order row itself
+    canteen = models.ForeignKey(Canteen, on_delete=models.CASCADE, db_index=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
@@ -114,10 +158,30 @@ class PreOrder(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Pickup counter queue and staff order lists for a day
+            models.Index(fields=['date', 'status', 'pickup_slot'], name='preorder_date_status_idx'),
+            # The same for one outlet
+            models.Index(fields=['canteen', 'date', 'status', 'pickup_slot'], name='preorder_outlet_day_idx'),
+            # Admin changelist order
+            models.Index(fields=['-created_at', '-id'], name='preorder_newest_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.order_number} - {self.user.username}"
     
+    @property
+    def qr_payload(self):
+        return f"{self.QR_PAYLOAD_PREFIX}{self.order_number}"
+    
+    @classmethod
+    def order_number_from_code(cls, code):
+        """Extract an order number from a typed order number or a scanned QR payload"""
+        code = (code or '').strip()
+        if code.upper().startswith(cls.QR_PAYLOAD_PREFIX):
+            code = code[len(cls.QR_PAYLOAD_PREFIX):]
+        return code.strip().upper()
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
             # Generate unique order number
@@ -125,5 +189,247 @@ class PreOrder(models.Model):
             import string
             self.order_number = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
         
+        if not self.canteen_id:
+            self.canteen_id = self.dish.canteen_id
         self.total_amount = self.dish.price * self.quantity
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class ArchivedPreOrder(models.Model):
+    """Picked up or cancelled PreOrder moved out of the hot table by archive_preorders"""
+    # Not indexed on its own: archived_outlet_day_idx leads with it
+    canteen = models.ForeignKey(Canteen, on_delete=models.CASCADE, db_index=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    pickup_slot = models.ForeignKey(PickupSlot, on_delete=models.CASCADE)
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=PreOrder.STATUS_CHOICES)
+    special_instructions = models.TextField(blank=True)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    order_number = models.CharField(max_length=20, unique=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archived_user_created_idx'),
+            models.Index(fields=['canteen', 'date'], name='archived_outlet_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Archived order #{self.order_number} - {self.user.username}"
+
+
+class DailyOrderRollup(models.Model):
+    """Per-day, per-dish, per-status totals for orders that have been archived"""
+    date = models.DateField()
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=PreOrder.STATUS_CHOICES)
+    order_count = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('date', 'dish', 'status')
+    
+    def __str__(self):
+        return f"{self.date} - {self.dish.name} ({self.status}): {self.order_count} orders"
+
+
+class DishRecommendation(models.Model):
+    """Precomputed "you may also like" neighbours of a dish, see build_recommendations"""
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['dish', 'rank']
+        unique_together = ('dish', 'rank')
+    
+    def __str__(self):
+        return f"{self.dish.name} -> {self.recommended.name} ({self.score:.2f})"
+
+
+class UserRecommendation(models.Model):
+    """Precomputed personalised dish suggestions for a user, see build_recommendations"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dish_recommendations')
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+    
+    class Meta:
+        ordering = ['user', 'rank']
+        unique_together = ('user', 'rank')
+    
+    def __str__(self):
+        return f"{self.user.username} -> {self.dish.name} ({self.score:.2f})"
+
+
+class DailyStock(models.Model):
+    """Portions of a dish the kitchen will make for a pickup date; dishes without a row are unlimited"""
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE, related_name='daily_stock')
+    date = models.DateField()
+    quantity = models.PositiveIntegerField(help_text="Portions prepared for this date")
+    remaining = models.PositiveIntegerField(help_text="Portions not yet booked")
+    
+    class Meta:
+        ordering = ['date', 'dish']
+        unique_together = ('dish', 'date')
+        indexes = [
+            models.Index(fields=['date', 'dish'], name='dailystock_date_dish_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.dish.name} on {self.date}: {self.remaining}/{self.quantity}"
+    
+    @property
+    def is_sold_out(self):
+        return self.remaining == 0
+
+
+class IdempotencyKey(models.Model):
+    """Client-supplied token remembering which order a booking request created"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=64)
+    preorder = models.ForeignKey(PreOrder, on_delete=models.CASCADE, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('user', 'key')
+        indexes = [
+            models.Index(fields=['created_at'], name='idempotency_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.key}"
+
+
+class BackgroundTask(models.Model):
+    """Deferred work enqueued by a request and run by the run_worker command"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class Notification(models.Model):
+    """Outbox row written in the same transaction as the change it announces, sent later in batches"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    preorder = models.ForeignKey(PreOrder, on_delete=models.SET_NULL, null=True, blank=True)
+    kind = models.CharField(max_length=30)
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # Pushed back after each failed send
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} to {self.recipient} ({self.status})"
+
+
+class OrderStatusEvent(models.Model):
+    """Append-only record of one order status change, kept after the order is archived"""
+    preorder_id = models.BigIntegerField()
+    order_number = models.CharField(max_length=20)
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
+    pickup_slot = models.ForeignKey(PickupSlot, on_delete=models.CASCADE)
+    pickup_date = models.DateField()
+    from_status = models.CharField(max_length=10, blank=True)
+    to_status = models.CharField(max_length=10)
+    changed_at = models.DateTimeField(default=timezone.now)
+    seconds_in_previous = models.PositiveIntegerField(null=True, blank=True, help_text="Time spent in from_status")
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    
+    class Meta:
+        ordering = ['changed_at']
+        indexes = [
+            models.Index(fields=['preorder_id', 'changed_at'], name='statusevent_order_idx'),
+            models.Index(fields=['changed_at', 'from_status'], name='statusevent_changed_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.order_number}: {self.from_status or '-'} -> {self.to_status}"
+
+
+class WaitlistEntry(models.Model):
+    """A student queued for a full pickup slot, booked automatically when a place frees up"""
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+        ('left', 'Left'),
+        ('skipped', 'Skipped'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    dish = models.ForeignKey(Dish, on_delete=models.CASCADE)
+    pickup_slot = models.ForeignKey(PickupSlot, on_delete=models.CASCADE)
+    date = models.DateField()
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    special_instructions = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting')
+    preorder = models.ForeignKey(PreOrder, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        indexes = [
+            # FIFO head of a (slot, date) queue is the first row of this index
+            models.Index(fields=['pickup_slot', 'date', 'status', 'created_at', 'id'], name='waitlist_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'dish', 'pickup_slot', 'date'],
+                condition=models.Q(status='waiting'),
+                name='waitlist_one_waiting_entry',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} waiting for {self.pickup_slot} on {self.date}"
@@ -0,0 +1,138 @@
+"""
+Transactional outbox for order notifications.
+
+Status changes add Notification rows inside their own transaction, so a
+message exists exactly when the change was committed. The dispatch task then
+sends due rows in batches over a single mail connection. A row that fails
+is backed off, a dispatch is queued for when it is due again, and it is
+marked failed after MAX_SEND_ATTEMPTS.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Min
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Notification
+from .tasks import retry_delay, task
+
+MAX_SEND_ATTEMPTS = 5
+SENDING_TIMEOUT = 60 * 10  # Seconds before rows claimed by a crashed dispatcher are sent again
+
+
+def queue_order_emails(preorders, kind, subject, template):
+    """Add an email about each order whose student has an address.
+
+    Call inside the transaction that changes the orders; the dispatch task is
+    enqueued in the same transaction. subject is formatted with the order.
+    """
+    dashboard_url = settings.CANTEEN_SITE_URL + reverse('canteen:dashboard')
+    notifications = [
+        Notification(
+            user=order.user,
+            preorder=order,
+            kind=kind,
+            recipient=order.user.email,
+            subject=subject.format(order=order),
+            body=render_to_string(template, {
+                'user': order.user,
+                'order': order,
+                'dashboard_url': dashboard_url,
+            }),
+        )
+        for order in preorders
+        if order.user.email
+    ]
+    if notifications:
+        Notification.objects.bulk_create(notifications)
+        dispatch_notifications.delay(unique=True)
+    return len(notifications)
+
+
+def queue_order_ready(preorders):
+    """Add an "order ready" email for every order whose student has an address"""
+    return queue_order_emails(
+        preorders, 'order_ready', 'Order #{order.order_number} is ready for pickup', 'canteen/emails/order_ready.txt'
+    )
+
+
+def queue_waitlist_promoted(preorders):
+    """Tell students that a place freed up and their waitlist entry became an order"""
+    return queue_order_emails(
+        preorders, 'waitlist_promoted', 'A place opened up: order #{order.order_number} is booked',
+        'canteen/emails/waitlist_promoted.txt'
+    )
+
+
+def claim_notifications(limit):
+    """Mark up to limit due pending notifications as sending for this dispatcher and return them"""
+    now = timezone.now()
+    Notification.objects.filter(status='sending', locked_at__lt=now - timedelta(seconds=SENDING_TIMEOUT)).update(
+        status='pending', locked_by='', locked_at=None
+    )
+    pending = list(
+        Notification.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+    )
+    if not pending:
+        return []
+    token = uuid.uuid4().hex
+    Notification.objects.filter(id__in=pending, status='pending').update(
+        status='sending', locked_by=token, locked_at=now, attempts=F('attempts') + 1
+    )
+    return list(Notification.objects.filter(locked_by=token, status='sending').order_by('created_at'))
+
+
+def send_batch(notifications, connection):
+    """Send claimed notifications over an open connection, returning (sent, failed) counts"""
+    sent_ids = []
+    failed = 0
+    for notification in notifications:
+        message = EmailMessage(notification.subject, notification.body, to=[notification.recipient], connection=connection)
+        try:
+            message.send()
+        except Exception as error:
+            failed += 1
+            # Not picked up again by this run; a dead mail server is retried with backoff
+            Notification.objects.filter(pk=notification.pk).update(
+                status='failed' if notification.attempts >= MAX_SEND_ATTEMPTS else 'pending',
+                locked_by='', locked_at=None, last_error=f'{type(error).__name__}: {error}'[:1000],
+                next_attempt_at=timezone.now() + timedelta(seconds=retry_delay(notification.attempts)),
+            )
+        else:
+            sent_ids.append(notification.pk)
+    Notification.objects.filter(pk__in=sent_ids).update(status='sent', sent_at=timezone.now(), locked_by='', locked_at=None)
+    return len(sent_ids), failed
+
+
+@task
+def dispatch_notifications(batch_size=None):
+    """Send every pending notification, opening one mail connection for the whole run"""
+    batch_size = batch_size or settings.CANTEEN_NOTIFICATION_BATCH_SIZE
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+        while True:
+            notifications = claim_notifications(batch_size)
+            if not notifications:
+                break
+            batch_sent, batch_failed = send_batch(notifications, connection)
+            sent += batch_sent
+            failed += batch_failed
+    finally:
+        connection.close()
+    if failed:
+        schedule_retry()
+    return sent, failed
+
+
+def schedule_retry():
+    """Queue a dispatch for when the earliest backed-off notification is due"""
+    due = Notification.objects.filter(status='pending').aggregate(due=Min('next_attempt_at'))['due']
+    if due is not None:
+        dispatch_notifications.delay(delay=max((due - timezone.now()).total_seconds(), 0), unique=True)
@@ -0,0 +1,54 @@
+"""
+Campus outlets.
+
+Every dish, pickup slot and order belongs to one Canteen. A visitor picks the
+outlet they are browsing with ?canteen=<slug>; the choice is kept in the
+session and defaults to the oldest active outlet. The list of outlets is
+cached because every page reads it.
+"""
+from django.core.cache import cache
+
+from .models import Canteen
+
+OUTLETS_CACHE_KEY = 'canteen:outlets'
+SESSION_KEY = 'canteen_outlet'
+
+
+def get_outlets():
+    """Every active outlet as {'id', 'name', 'slug'} dicts, oldest first"""
+    outlets = cache.get(OUTLETS_CACHE_KEY)
+    if outlets is None:
+        outlets = list(Canteen.objects.filter(is_active=True).values('id', 'name', 'slug'))
+        cache.set(OUTLETS_CACHE_KEY, outlets, None)
+    return outlets
+
+
+def invalidate_outlets():
+    cache.delete(OUTLETS_CACHE_KEY)
+
+
+def get_default_outlet():
+    outlets = get_outlets()
+    return outlets[0] if outlets else None
+
+
+def get_outlet(slug):
+    """The active outlet with this slug, or None"""
+    return next((outlet for outlet in get_outlets() if outlet['slug'] == slug), None)
+
+
+def get_current_outlet(request):
+    """The outlet this request is browsing, or None when no outlet is active"""
+    if not hasattr(request, '_canteen_outlet'):
+        outlet = get_outlet(request.GET.get('canteen'))
+        if outlet is None:
+            outlet = get_outlet(request.session.get(SESSION_KEY)) or get_default_outlet()
+        elif request.session.get(SESSION_KEY) != outlet['slug']:
+            request.session[SESSION_KEY] = outlet['slug']
+        request._canteen_outlet = outlet
+    return request._canteen_outlet
+
+
+def current_outlet_id(request):
+    outlet = get_current_outlet(request)
+    return outlet['id'] if outlet else None
@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Cannot encode {type(value).__name__} in a cursor')
+
+
+def encode_cursor(obj, ordering):
+    """Opaque cursor holding the ordering values of the last row on a page"""
+    values = [
+        obj[field.lstrip('-')] if isinstance(obj, dict) else getattr(obj, field.lstrip('-'))
+        for field in ordering
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values, default=_json_default).encode()).decode()
+
+
+def decode_cursor(cursor, ordering):
+    """Decode a cursor into ordering values, returning None if it is malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        return None
+    if not all(isinstance(value, (str, int, float)) for value in values):
+        return None
+    return values
+
+
+def keyset_filter(ordering, values):
+    """Build the "row comes after (values)" condition for a mixed-direction ordering"""
+    condition = Q()
+    for i, field in enumerate(ordering):
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        step = Q(**{f'{field.lstrip("-")}__{lookup}': values[i]})
+        for prev_field, prev_value in zip(ordering[:i], values[:i]):
+            step &= Q(**{prev_field.lstrip('-'): prev_value})
+        condition |= step
+    return condition
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=20):
+    """Return (rows, next_cursor, is_first_page) for one keyset-paginated page.
+
+    Each ordering must end with a unique column. Values in the cursor are
+    converted back by the model fields, and a cursor that does not fit them
+    falls back to the first page.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor, ordering) if cursor else None
+    rows = None
+    if values is not None:
+        try:
+            # Fetch one extra row to know whether another page exists
+            rows = list(queryset.filter(keyset_filter(ordering, values))[:per_page + 1])
+        except (ValidationError, ValueError, TypeError):
+            values = None
+    if rows is None:
+        rows = list(queryset[:per_page + 1])
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1], ordering) if has_next else None
+    return rows, next_cursor, values is None
+
+
+def estimated_table_rows(queryset):
+    """The planner's row estimate for an unfiltered PostgreSQL table, or None"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+        row = cursor.fetchone()
+    # reltuples is -1 until the table has been vacuumed or analyzed
+    return int(row[0]) if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator for admin changelists over very large tables.
+
+    An unfiltered PostgreSQL table reports the planner's estimate; any other
+    list counts at most count_limit + 1 rows, so neither scans the whole table.
+    Past the limit the page count is approximate.
+    """
+    count_limit = 10000
+    
+    @cached_property
+    def count(self):
+        estimate = estimated_table_rows(self.object_list)
+        if estimate is not None and estimate > self.count_limit:
+            return estimate
+        return self.object_list.order_by()[:self.count_limit + 1].count()
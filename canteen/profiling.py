@@ -0,0 +1,185 @@
+"""
+Opt-in request profiling.
+
+ProfilingMiddleware runs cProfile around the view for staff requests carrying
+?profile=1 and for a random sample of all requests (CANTEEN_PROFILING_SAMPLE_RATE).
+Each profiled request writes the raw .prof file plus a JSON summary with the
+top functions and the time spent rendering every template to
+CANTEEN_PROFILING_DIR, where the staff profiles page reads them back.
+"""
+import cProfile
+import json
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.template.base import Template
+
+TOP_FUNCTIONS = 25
+
+_local = threading.local()
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        timings = getattr(_local, 'template_timings', None)
+        if timings is None:
+            return render(self, context)
+        # Recorded when the render starts so nested templates list under their parent
+        timing = {'name': self.name or '<string>', 'ms': None, 'depth': _local.depth}
+        timings.append(timing)
+        _local.depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            _local.depth -= 1
+            timing['ms'] = round((time.perf_counter() - start) * 1000, 2)
+    wrapper.is_timed = True
+    return wrapper
+
+
+def install_template_timer():
+    """Time Template.render, a no-op for requests that are not being profiled"""
+    if not getattr(Template.render, 'is_timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+@contextmanager
+def record_template_timings():
+    """Collect the render time of every template rendered inside the block on this thread"""
+    install_template_timer()
+    timings = []
+    _local.template_timings = timings
+    _local.depth = 0
+    try:
+        yield timings
+    finally:
+        _local.template_timings = None
+
+
+def profile_dir():
+    return Path(settings.CANTEEN_PROFILING_DIR)
+
+
+def top_functions(profiler, limit=TOP_FUNCTIONS, sort='cumulative'):
+    """The most expensive functions by cumulative (or own, with sort='tottime') time"""
+    stats = pstats.Stats(profiler)
+    stats.sort_stats(sort)
+    functions = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, calls, total_time, cumulative_time, _ = stats.stats[func]
+        filename, line, name = func
+        functions.append({
+            'function': name,
+            'location': f'{filename}:{line}' if line else filename,
+            'calls': calls,
+            'total_ms': round(total_time * 1000, 2),
+            'cumulative_ms': round(cumulative_time * 1000, 2),
+        })
+    return functions
+
+
+def save_profile(request, response, profiler, elapsed, template_timings):
+    """Write the .prof dump and its JSON summary, returning the profile id"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = f'{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}'
+
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+    summary = {
+        'id': profile_id,
+        'path': request.get_full_path(),
+        'method': request.method,
+        'status': response.status_code,
+        'user': request.user.get_username() if request.user.is_authenticated else '',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'total_ms': round(elapsed * 1000, 2),
+        'template_ms': round(sum(timing['ms'] for timing in template_timings if timing['depth'] == 0), 2),
+        'templates': template_timings,
+        'functions': top_functions(profiler),
+        'hotspot': next(iter(top_functions(profiler, limit=1, sort='tottime')), None),
+    }
+    (directory / f'{profile_id}.json').write_text(json.dumps(summary))
+    prune_profiles()
+    return profile_id
+
+
+def prune_profiles():
+    """Keep only the newest CANTEEN_PROFILING_KEEP profiles"""
+    summaries = sorted(profile_dir().glob('*.json'), reverse=True)
+    for summary in summaries[settings.CANTEEN_PROFILING_KEEP:]:
+        summary.unlink(missing_ok=True)
+        summary.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def load_profiles():
+    """Every stored profile summary, slowest first"""
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    profiles = []
+    for path in directory.glob('*.json'):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda profile: profile['total_ms'], reverse=True)
+    return profiles
+
+
+def load_profile(profile_id):
+    """One profile summary by id, or None"""
+    path = profile_dir() / f'{Path(profile_id).name}.json'
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _is_staff(user):
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    profile = getattr(user, 'userprofile', None)
+    return bool(profile and profile.is_staff_member)
+
+
+class ProfilingMiddleware:
+    """Profile the view and template rendering of opted-in requests.
+
+    Keep this last in MIDDLEWARE so the profile covers the view rather than
+    the rest of the middleware stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.CANTEEN_PROFILING_SAMPLE_RATE
+        install_template_timer()
+
+    def should_profile(self, request):
+        if request.GET.get('profile') == '1' and _is_staff(request.user):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        with record_template_timings() as template_timings:
+            start = time.perf_counter()
+            response = profiler.runcall(self.get_response, request)
+            elapsed = time.perf_counter() - start
+
+        response['X-Profile-Id'] = save_profile(request, response, profiler, elapsed, template_timings)
+        return response
@@ -0,0 +1,337 @@
+"""
+Minimal pure-Python QR code encoder (byte mode, versions 1-40) with SVG output.
+
+Order QR codes only ever carry a short ASCII payload, so this deliberately
+implements just the parts of ISO/IEC 18004 we need instead of pulling in a
+third-party dependency.
+"""
+from django.core.cache import cache
+
+from .models import PreOrder
+
+ERROR_CORRECTION_LEVELS = {'L': 0, 'M': 1, 'Q': 2, 'H': 3}
+# Format-information bits for each level, in the order above
+_FORMAT_BITS = [1, 0, 3, 2]
+
+# Indexed by [level][version]; index 0 is unused
+_ECC_CODEWORDS_PER_BLOCK = [
+    [-1, 7, 10, 15, 20, 26, 18, 20, 24, 30, 18, 20, 24, 26, 30, 22, 24, 28, 30, 28, 28, 28, 28, 30, 30, 26, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30],
+    [-1, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26, 30, 22, 22, 24, 24, 28, 28, 26, 26, 26, 26, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28, 28],
+    [-1, 13, 22, 18, 26, 18, 24, 18, 22, 20, 24, 28, 26, 24, 20, 30, 24, 28, 28, 26, 30, 28, 30, 30, 30, 30, 28, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30],
+    [-1, 17, 28, 22, 16, 22, 28, 26, 26, 24, 28, 24, 28, 22, 24, 24, 30, 28, 28, 26, 28, 30, 24, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30, 30],
+]
+_NUM_ERROR_CORRECTION_BLOCKS = [
+    [-1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 4, 4, 4, 4, 4, 6, 6, 6, 6, 7, 8, 8, 9, 9, 10, 12, 12, 12, 13, 14, 15, 16, 17, 18, 19, 19, 20, 21, 22, 24, 25],
+    [-1, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5, 5, 8, 9, 9, 10, 10, 11, 13, 14, 16, 17, 17, 18, 20, 21, 23, 25, 26, 28, 29, 31, 33, 35, 37, 38, 40, 43, 45, 47, 49],
+    [-1, 1, 1, 2, 2, 4, 4, 6, 6, 8, 8, 8, 10, 12, 16, 12, 17, 16, 18, 21, 20, 23, 23, 25, 27, 29, 34, 34, 35, 38, 40, 43, 45, 48, 51, 53, 56, 59, 62, 65, 68],
+    [-1, 1, 1, 2, 4, 4, 4, 5, 6, 8, 8, 11, 11, 16, 16, 18, 16, 19, 21, 25, 25, 25, 34, 30, 32, 35, 37, 40, 42, 45, 48, 51, 54, 57, 60, 63, 66, 70, 74, 77, 81],
+]
+
+_MASKS = [
+    lambda x, y: (x + y) % 2 == 0,
+    lambda x, y: y % 2 == 0,
+    lambda x, y: x % 3 == 0,
+    lambda x, y: (x + y) % 3 == 0,
+    lambda x, y: (x // 3 + y // 2) % 2 == 0,
+    lambda x, y: x * y % 2 + x * y % 3 == 0,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2 == 0,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2 == 0,
+]
+
+_FINDER_LIKE = ([True, False, True, True, True, False, True, False, False, False, False],
+                [False, False, False, False, True, False, True, True, True, False, True])
+
+ORDER_QR_CACHE_TIMEOUT = 60 * 60 * 24 * 7  # Orders are booked at most a week ahead
+
+
+def _gf_multiply(x, y):
+    """Multiply two elements of GF(2^8) modulo the QR polynomial 0x11D"""
+    z = 0
+    for i in reversed(range(8)):
+        z = (z << 1) ^ ((z >> 7) * 0x11D)
+        z ^= ((y >> i) & 1) * x
+    return z
+
+
+def _reed_solomon_divisor(degree):
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = _gf_multiply(result[j], root)
+            if j + 1 < degree:
+                result[j] ^= result[j + 1]
+        root = _gf_multiply(root, 0x02)
+    return result
+
+
+def _reed_solomon_remainder(data, divisor):
+    result = [0] * len(divisor)
+    for byte in data:
+        factor = byte ^ result.pop(0)
+        result.append(0)
+        for i, coefficient in enumerate(divisor):
+            result[i] ^= _gf_multiply(coefficient, factor)
+    return result
+
+
+def _num_raw_data_modules(version):
+    result = (16 * version + 128) * version + 64
+    if version >= 2:
+        num_align = version // 7 + 2
+        result -= (25 * num_align - 10) * num_align - 55
+        if version >= 7:
+            result -= 36
+    return result
+
+
+def _num_data_codewords(version, level):
+    return (_num_raw_data_modules(version) // 8
+            - _ECC_CODEWORDS_PER_BLOCK[level][version] * _NUM_ERROR_CORRECTION_BLOCKS[level][version])
+
+
+def _alignment_positions(version):
+    if version == 1:
+        return []
+    size = version * 4 + 17
+    num_align = version // 7 + 2
+    step = (version * 8 + num_align * 3 + 5) // (num_align * 4 - 4) * 2
+    result = [size - 7 - i * step for i in range(num_align - 1)] + [6]
+    return list(reversed(result))
+
+
+def _add_ecc_and_interleave(data, version, level):
+    num_blocks = _NUM_ERROR_CORRECTION_BLOCKS[level][version]
+    block_ecc_len = _ECC_CODEWORDS_PER_BLOCK[level][version]
+    raw_codewords = _num_raw_data_modules(version) // 8
+    num_short_blocks = num_blocks - raw_codewords % num_blocks
+    short_block_len = raw_codewords // num_blocks
+
+    divisor = _reed_solomon_divisor(block_ecc_len)
+    blocks = []
+    k = 0
+    for i in range(num_blocks):
+        length = short_block_len - block_ecc_len + (0 if i < num_short_blocks else 1)
+        block = data[k:k + length]
+        k += length
+        ecc = _reed_solomon_remainder(block, divisor)
+        if i < num_short_blocks:
+            block.append(0)
+        blocks.append(block + ecc)
+
+    result = []
+    for i in range(len(blocks[0])):
+        for j, block in enumerate(blocks):
+            # Skip the padding byte of short blocks
+            if i != short_block_len - block_ecc_len or j >= num_short_blocks:
+                result.append(block[i])
+    return result
+
+
+class _Matrix:
+    def __init__(self, version):
+        self.version = version
+        self.size = version * 4 + 17
+        self.modules = [[False] * self.size for _ in range(self.size)]
+        self.is_function = [[False] * self.size for _ in range(self.size)]
+
+    def set_function(self, x, y, dark):
+        self.modules[y][x] = dark
+        self.is_function[y][x] = True
+
+    def draw_function_patterns(self):
+        size = self.size
+        for i in range(size):
+            self.set_function(6, i, i % 2 == 0)
+            self.set_function(i, 6, i % 2 == 0)
+
+        for cx, cy in ((3, 3), (size - 4, 3), (3, size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    x, y = cx + dx, cy + dy
+                    if 0 <= x < size and 0 <= y < size:
+                        self.set_function(x, y, max(abs(dx), abs(dy)) not in (2, 4))
+
+        positions = _alignment_positions(self.version)
+        last = len(positions) - 1
+        for i, cx in enumerate(positions):
+            for j, cy in enumerate(positions):
+                # The three corners are already taken by finder patterns
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        self.set_function(cx + dx, cy + dy, max(abs(dx), abs(dy)) != 1)
+
+        # Reserve the format areas, the real bits are drawn once the mask is known
+        self.draw_format_bits(0, 0)
+
+        if self.version >= 7:
+            remainder = self.version
+            for _ in range(12):
+                remainder = (remainder << 1) ^ ((remainder >> 11) * 0x1F25)
+            bits = self.version << 12 | remainder
+            for i in range(18):
+                dark = (bits >> i) & 1 != 0
+                a, b = size - 11 + i % 3, i // 3
+                self.set_function(a, b, dark)
+                self.set_function(b, a, dark)
+
+    def draw_format_bits(self, level, mask):
+        data = _FORMAT_BITS[level] << 3 | mask
+        remainder = data
+        for _ in range(10):
+            remainder = (remainder << 1) ^ ((remainder >> 9) * 0x537)
+        bits = (data << 10 | remainder) ^ 0x5412
+
+        def bit(i):
+            return (bits >> i) & 1 != 0
+
+        size = self.size
+        for i in range(6):
+            self.set_function(8, i, bit(i))
+        self.set_function(8, 7, bit(6))
+        self.set_function(8, 8, bit(7))
+        self.set_function(7, 8, bit(8))
+        for i in range(9, 15):
+            self.set_function(14 - i, 8, bit(i))
+
+        for i in range(8):
+            self.set_function(size - 1 - i, 8, bit(i))
+        for i in range(8, 15):
+            self.set_function(8, size - 15 + i, bit(i))
+        self.set_function(8, size - 8, True)
+
+    def draw_codewords(self, codewords):
+        size = self.size
+        i = 0
+        total_bits = len(codewords) * 8
+        right = size - 1
+        while right >= 1:
+            if right == 6:
+                right = 5
+            upward = (right + 1) & 2 == 0
+            for vert in range(size):
+                y = size - 1 - vert if upward else vert
+                for x in (right, right - 1):
+                    if not self.is_function[y][x] and i < total_bits:
+                        self.modules[y][x] = (codewords[i >> 3] >> (7 - (i & 7))) & 1 != 0
+                        i += 1
+            right -= 2
+
+    def apply_mask(self, mask):
+        condition = _MASKS[mask]
+        for y in range(self.size):
+            row, function_row = self.modules[y], self.is_function[y]
+            for x in range(self.size):
+                if not function_row[x] and condition(x, y):
+                    row[x] = not row[x]
+
+    def penalty(self):
+        size = self.size
+        lines = self.modules + [list(column) for column in zip(*self.modules)]
+        score = 0
+
+        for line in lines:
+            # Runs of five or more same-coloured modules
+            run = 1
+            for a, b in zip(line, line[1:]):
+                if a == b:
+                    run += 1
+                else:
+                    if run >= 5:
+                        score += run - 2
+                    run = 1
+            if run >= 5:
+                score += run - 2
+
+            # Finder-like 1:1:3:1:1 patterns with a light margin
+            for start in range(size - 10):
+                if line[start:start + 11] in _FINDER_LIKE:
+                    score += 40
+
+        # 2x2 blocks of one colour
+        for y in range(size - 1):
+            upper, lower = self.modules[y], self.modules[y + 1]
+            for x in range(size - 1):
+                if upper[x] == upper[x + 1] == lower[x] == lower[x + 1]:
+                    score += 3
+
+        # Imbalance between dark and light modules, 10 points per 5% away from half
+        dark = sum(sum(row) for row in self.modules)
+        score += int(abs(dark * 100 / (size * size) - 50) // 5) * 10
+        return score
+
+
+def encode(text, level='M'):
+    """Encode text as a QR code, returning rows of booleans (True is dark)"""
+    level = ERROR_CORRECTION_LEVELS[level]
+    data = text.encode('utf-8')
+
+    for version in range(1, 41):
+        count_bits = 8 if version < 10 else 16
+        capacity_bits = _num_data_codewords(version, level) * 8
+        if 4 + count_bits + len(data) * 8 <= capacity_bits:
+            break
+    else:
+        raise ValueError('Data too long to fit in a QR code')
+
+    bits = [0, 1, 0, 0]  # Byte mode indicator
+    bits += [(len(data) >> i) & 1 for i in reversed(range(count_bits))]
+    for byte in data:
+        bits += [(byte >> i) & 1 for i in reversed(range(8))]
+    bits += [0] * min(4, capacity_bits - len(bits))
+    bits += [0] * (-len(bits) % 8)
+
+    codewords = [int(''.join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+    pad = 0xEC
+    while len(codewords) < capacity_bits // 8:
+        codewords.append(pad)
+        pad ^= 0xEC ^ 0x11
+
+    matrix = _Matrix(version)
+    matrix.draw_function_patterns()
+    matrix.draw_codewords(_add_ecc_and_interleave(codewords, version, level))
+
+    # Try every mask and keep the one that is easiest to scan
+    best_mask, best_penalty = 0, None
+    for mask in range(8):
+        matrix.apply_mask(mask)
+        matrix.draw_format_bits(level, mask)
+        penalty = matrix.penalty()
+        if best_penalty is None or penalty < best_penalty:
+            best_mask, best_penalty = mask, penalty
+        matrix.apply_mask(mask)  # Masks are XORs, so applying again undoes it
+
+    matrix.apply_mask(best_mask)
+    matrix.draw_format_bits(level, best_mask)
+    return matrix.modules
+
+
+def to_svg(modules, border=4):
+    """Render a module matrix as a compact SVG document"""
+    size = len(modules) + border * 2
+    path = ''.join(
+        f'M{x + border},{y + border}h1v1h-1z'
+        for y, row in enumerate(modules)
+        for x, dark in enumerate(row)
+        if dark
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+        f'<rect width="100%" height="100%" fill="#fff"/><path d="{path}" fill="#000"/></svg>'
+    )
+
+
+def order_qr_cache_key(order_number):
+    return f'canteen:order_qr:{order_number}'
+
+
+def get_order_qr_svg(order_number):
+    """Return the SVG QR code for an order, encoding it only on a cache miss"""
+    key = order_qr_cache_key(order_number)
+    svg = cache.get(key)
+    if svg is None:
+        svg = to_svg(encode(f'{PreOrder.QR_PAYLOAD_PREFIX}{order_number}'))
+        cache.set(key, svg, ORDER_QR_CACHE_TIMEOUT)
+    return svg
@@ -0,0 +1,161 @@
+"""
+Offline item-item recommendations built from order and review history.
+
+New reviews queue the tasks.refresh_recommendations background task, which
+imports this module inside the worker to rebuild the tables; the
+build_recommendations management command runs the same rebuild on demand.
+Views only read the precomputed DishRecommendation / UserRecommendation tables.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from .models import ArchivedPreOrder, Dish, DishRecommendation, PreOrder, Review, UserRecommendation
+
+USER_CHUNK_SIZE = 5000  # Users per dense block when accumulating co-occurrence
+DISH_CHUNK_SIZE = 1000  # Dishes whose similarity rows are computed together before keeping the top k
+
+
+def _interaction_rows():
+    """Yield (user_id, dish_id, strength) for every user that ordered or reviewed a dish"""
+    for model in (PreOrder, ArchivedPreOrder):
+        orders = (
+            model.objects.exclude(status='cancelled')
+            .values_list('user_id', 'dish_id')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for user_id, dish_id, count in orders.iterator():
+            yield user_id, dish_id, np.log1p(count)
+
+    # Ratings push a dish up or down from neutral (3 stars)
+    for user_id, dish_id, rating in Review.objects.values_list('user_id', 'dish_id', 'rating').iterator():
+        yield user_id, dish_id, (rating - 3) / 2
+
+
+def build_interactions():
+    """Return the user ids, dish ids and sparse (row, col, value) user x dish interactions"""
+    dish_ids = np.fromiter(Dish.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    rows = np.array(list(_interaction_rows()), dtype=np.float64).reshape(-1, 3)
+    if not len(dish_ids) or not len(rows):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, dish_ids, empty, empty, np.empty(0)
+
+    user_ids, user_index = np.unique(rows[:, 0].astype(np.int64), return_inverse=True)
+    dish_index = np.searchsorted(dish_ids, rows[:, 1].astype(np.int64))
+    known = (dish_index < len(dish_ids)) & (dish_ids[np.minimum(dish_index, len(dish_ids) - 1)] == rows[:, 1])
+
+    # Sum duplicate (user, dish) pairs, e.g. an order plus a review
+    flat = user_index[known] * len(dish_ids) + dish_index[known]
+    keys, inverse = np.unique(flat, return_inverse=True)
+    values = np.zeros(len(keys))
+    np.add.at(values, inverse, rows[known, 2])
+    values = np.clip(values, 0, None)
+
+    return user_ids, dish_ids, keys // len(dish_ids), keys % len(dish_ids), values
+
+
+def _dense_block(user_rows, dish_cols, values, start, stop, num_dishes):
+    """Densify the interactions of users [start, stop) into a small block"""
+    lo, hi = np.searchsorted(user_rows, [start, stop])
+    block = np.zeros((stop - start, num_dishes), dtype=np.float32)
+    block[user_rows[lo:hi] - start, dish_cols[lo:hi]] = values[lo:hi]
+    return block
+
+
+def item_neighbours(user_rows, dish_cols, values, num_users, num_dishes, k):
+    """The k most cosine-similar dishes of every dish as (indices, scores), best first.
+
+    Similarity is computed for DISH_CHUNK_SIZE dishes at a time against all
+    others and cut to the top k straight away, so memory stays at one
+    DISH_CHUNK_SIZE x num_dishes block however large the menu grows.
+    """
+    norms = np.sqrt(np.bincount(dish_cols, weights=values ** 2, minlength=num_dishes))
+    neighbours, neighbour_scores = [], []
+    for first in range(0, num_dishes, DISH_CHUNK_SIZE):
+        last = min(first + DISH_CHUNK_SIZE, num_dishes)
+        cooccurrence = np.zeros((last - first, num_dishes), dtype=np.float64)
+        for start in range(0, num_users, USER_CHUNK_SIZE):
+            block = _dense_block(user_rows, dish_cols, values, start, min(start + USER_CHUNK_SIZE, num_users), num_dishes)
+            cooccurrence += block[:, first:last].T @ block
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = cooccurrence / np.outer(norms[first:last], norms)
+        similarity[~np.isfinite(similarity)] = 0
+        similarity[np.arange(last - first), np.arange(first, last)] = 0  # A dish is not its own neighbour
+        best, best_scores = top_k(similarity, k)
+        neighbours.append(best)
+        neighbour_scores.append(best_scores)
+    if not neighbours:
+        return np.empty((0, 0), dtype=np.int64), np.empty((0, 0))
+    return np.vstack(neighbours), np.vstack(neighbour_scores)
+
+
+def user_scores(user_rows, dish_cols, values, neighbours, neighbour_scores, num_dishes):
+    """Sparse (user, dish, score) suggestions: each dish a user liked votes for its neighbours.
+
+    Dishes the user already ordered or reviewed are left out, including ones
+    rated so low that their interaction was clipped to zero.
+    """
+    liked = values > 0
+    users = np.repeat(user_rows[liked], neighbours.shape[1])
+    dishes = neighbours[dish_cols[liked]].ravel()
+    votes = (values[liked, None] * neighbour_scores[dish_cols[liked]]).ravel()
+
+    keys, inverse = np.unique(users * num_dishes + dishes, return_inverse=True)
+    scores = np.bincount(inverse, weights=votes, minlength=len(keys))
+    fresh = ~np.isin(keys, user_rows * num_dishes + dish_cols) & (scores > 0)
+    keys, scores = keys[fresh], scores[fresh]
+    return keys // num_dishes, keys % num_dishes, scores
+
+
+def top_k_per_user(users, dishes, scores, k):
+    """Keep the k best suggestions of every user, returning (users, dishes, scores, ranks)"""
+    order = np.lexsort((-scores, users))
+    users, dishes, scores = users[order], dishes[order], scores[order]
+    ranks = np.arange(len(users)) - np.searchsorted(users, users)
+    keep = ranks < k
+    return users[keep], dishes[keep], scores[keep], ranks[keep]
+
+
+def top_k(scores, k):
+    """Return (indices, scores) of the k best positive entries of every row, best first"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0))
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1)
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def build_recommendations(k=8, stdout=None):
+    """Recompute both recommendation tables, returning (dish rows, user rows) written"""
+    user_ids, dish_ids, user_rows, dish_cols, values = build_interactions()
+    num_users, num_dishes = len(user_ids), len(dish_ids)
+    if stdout:
+        stdout.write(f'{len(values)} interactions from {num_users} users across {num_dishes} dishes')
+
+    neighbours, neighbour_scores = item_neighbours(user_rows, dish_cols, values, num_users, num_dishes, k)
+    dish_recommendations = [
+        DishRecommendation(dish_id=int(dish_ids[i]), recommended_id=int(dish_ids[j]), score=float(score), rank=rank)
+        for i in range(num_dishes)
+        for rank, (j, score) in enumerate(zip(neighbours[i], neighbour_scores[i]))
+        if score > 0
+    ]
+
+    users, dishes, scores, ranks = top_k_per_user(
+        *user_scores(user_rows, dish_cols, values, neighbours, neighbour_scores, num_dishes), k
+    )
+    user_recommendations = [
+        UserRecommendation(user_id=int(user_ids[u]), dish_id=int(dish_ids[d]), score=float(score), rank=int(rank))
+        for u, d, score, rank in zip(users, dishes, scores, ranks)
+    ]
+
+    # One transaction, so readers keep the previous tables until the new ones are complete
+    with transaction.atomic():
+        DishRecommendation.objects.all().delete()
+        UserRecommendation.objects.all().delete()
+        DishRecommendation.objects.bulk_create(dish_recommendations, batch_size=5000)
+        UserRecommendation.objects.bulk_create(user_recommendations, batch_size=5000)
+
+    return len(dish_recommendations), len(user_recommendations)
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+
+from .models import Review
+from .pagination import keyset_page
+
+REVIEWS_PER_PAGE = 10
+RATING_SUMMARY_TIMEOUT = 60 * 60  # Invalidated on review changes, TTL is a safety net
+
+# Each ordering ends with a unique column so the keyset cursor is unambiguous
+REVIEW_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'highest': ('-rating', '-created_at', '-id'),
+    'lowest': ('rating', '-created_at', '-id'),
+}
+DEFAULT_REVIEW_SORT = 'newest'
+
+
+def rating_summary_cache_key(dish_id):
+    return f'canteen:dish:{dish_id}:rating_summary'
+
+
+def get_rating_summary(dish):
+    """Return average, count and star histogram for a dish, cached between review changes"""
+    key = rating_summary_cache_key(dish.pk)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    # One aggregate query computes the average, total and every star bucket
+    aggregates = {f'star_{star}': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+    totals = Review.objects.filter(dish=dish).aggregate(
+        average=Avg('rating'),
+        count=Count('id'),
+        **aggregates
+    )
+
+    count = totals['count']
+    histogram = []
+    for star in range(5, 0, -1):
+        star_count = totals[f'star_{star}']
+        histogram.append({
+            'stars': star,
+            'count': star_count,
+            'percent': round(star_count * 100 / count) if count else 0,
+        })
+
+    summary = {
+        'average': round(totals['average'], 1) if totals['average'] is not None else 0,
+        'count': count,
+        'histogram': histogram,
+    }
+    cache.set(key, summary, RATING_SUMMARY_TIMEOUT)
+    return summary
+
+
+def invalidate_rating_summary(dish_id):
+    cache.delete(rating_summary_cache_key(dish_id))
+
+
+def get_review_page(dish, sort=DEFAULT_REVIEW_SORT, cursor=None, per_page=REVIEWS_PER_PAGE):
+    """Return one keyset-paginated page of reviews for a dish.
+
+    The cost of a page does not depend on how far into the list it is, since
+    the cursor seeks straight to the next row through the matching index.
+    """
+    if sort not in REVIEW_ORDERINGS:
+        sort = DEFAULT_REVIEW_SORT
+    ordering = REVIEW_ORDERINGS[sort]
+
+    reviews = Review.objects.filter(dish=dish).select_related('user')
+    rows, next_cursor, is_first_page = keyset_page(reviews, ordering, cursor, per_page)
+
+    return {
+        'reviews': rows,
+        'sort': sort,
+        'has_next': next_cursor is not None,
+        'next_cursor': next_cursor,
+        'is_first_page': is_first_page,
+    }
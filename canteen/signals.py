@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .menu import publish_menu, record_removal
+from .models import Canteen, Category, Dish, Review
+from .outlets import invalidate_outlets
+from .reviews import invalidate_rating_summary
+from .tasks import refresh_recommendations
+
+RECOMMENDATION_REFRESH_DELAY = 60 * 10  # Reviews within this window share one rebuild
+
+
+@receiver([post_save, post_delete], sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Drop the cached rating summary whenever a dish's reviews change"""
+    invalidate_rating_summary(instance.dish_id)
+
+
+@receiver([post_save, post_delete], sender=Dish)
+@receiver([post_save, post_delete], sender=Category)
+def menu_changed(sender, **kwargs):
+    """Republish every outlet's menu so every process rebuilds its snapshots with the change"""
+    publish_menu()
+
+
+@receiver([post_save, post_delete], sender=Dish)
+def dish_removed(sender, instance, signal, **kwargs):
+    """A deleted or withdrawn dish makes the next menu sync send the ids still on the menu"""
+    if signal is post_delete or not instance.is_available:
+        record_removal(instance.canteen_id)
+
+
+@receiver([post_save, post_delete], sender=Review)
+def rating_changed(sender, instance, **kwargs):
+    """A new rating only touches the menu of the dish's outlet"""
+    canteen_id = Dish.objects.filter(pk=instance.dish_id).values_list('canteen_id', flat=True).first()
+    if canteen_id:
+        publish_menu(canteen_id)
+
+
+@receiver([post_save, post_delete], sender=Canteen)
+def outlets_changed(sender, **kwargs):
+    invalidate_outlets()
+    publish_menu()
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Schedule a recommendation rebuild in the background; repeated reviews reuse the pending one"""
+    if created:
+        refresh_recommendations.delay(delay=RECOMMENDATION_REFRESH_DELAY, unique=True)
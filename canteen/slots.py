@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import PickupSlot, PreOrder
+
+SLOT_LOAD_TIMEOUT = 30  # Seconds; short enough that staff never see a stale "full"
+
+
+def slot_loads_cache_key(day, canteen_id=None):
+    return f'canteen:slot_loads:{canteen_id}:{day.isoformat()}'
+
+
+def get_slot_loads(day, canteen_id=None):
+    """Return every active slot of an outlet with its booked order count and fill ratio for a date"""
+    key = slot_loads_cache_key(day, canteen_id)
+    loads = cache.get(key)
+    if loads is not None:
+        return loads
+
+    # One grouped query for all slots of the day
+    orders = PreOrder.objects.filter(date=day, status__in=PickupSlot.ACTIVE_ORDER_STATUSES)
+    slots = PickupSlot.objects.filter(is_active=True)
+    if canteen_id is not None:
+        orders = orders.filter(canteen_id=canteen_id)
+        slots = slots.filter(canteen_id=canteen_id)
+    counts = dict(orders.values_list('pickup_slot').annotate(count=Count('id')).order_by())
+
+    loads = []
+    for slot in slots:
+        orders = counts.get(slot.id, 0)
+        loads.append({
+            'id': slot.id,
+            'label': str(slot),
+            'start_time': slot.start_time,
+            'end_time': slot.end_time,
+            'max_orders': slot.max_orders,
+            'orders': orders,
+            'fill_ratio': round(orders / slot.max_orders, 3) if slot.max_orders else 1.0,
+            'is_full': orders >= slot.max_orders,
+        })
+    cache.set(key, loads, SLOT_LOAD_TIMEOUT)
+    return loads
+
+
+def invalidate_slot_loads(day, canteen_id):
+    cache.delete_many([slot_loads_cache_key(day, canteen_id), slot_loads_cache_key(day)])
+
+
+def earliest_ready_time(day, preparation_time):
+    """Earliest time of day a dish with this preparation time can be ready on a date"""
+    opens_at = settings.CANTEEN_KITCHEN_OPENS_AT
+    earliest = datetime.combine(day, opens_at) + timedelta(minutes=preparation_time)
+    # Wall-clock time in the canteen's TIME_ZONE, whatever the server's clock is set to
+    now = timezone.localtime().replace(tzinfo=None)
+    if day == now.date():
+        earliest = max(earliest, now + timedelta(minutes=preparation_time))
+    return earliest.time() if earliest.date() == day else None
+
+
+def suggest_slot(day, dish=None, loads=None):
+    """Pick the least-loaded open slot that still leaves the kitchen time to prepare the dish"""
+    if loads is None:
+        loads = get_slot_loads(day, dish.canteen_id if dish else None)
+    ready_by = earliest_ready_time(day, dish.preparation_time if dish else 0)
+    if ready_by is None:
+        return None
+
+    candidates = [load for load in loads if not load['is_full'] and load['start_time'] >= ready_by]
+    if not candidates:
+        return None
+    return min(candidates, key=lambda load: (load['fill_ratio'], load['start_time']))
@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db.models import F, Sum
+
+from .models import DailyStock, PickupSlot, PreOrder
+
+STOCK_LEVELS_TIMEOUT = 30
+LOW_STOCK_THRESHOLD = 5
+# Orders with portions set aside, given back if the order is cancelled
+RESERVED_STATUSES = PickupSlot.ACTIVE_ORDER_STATUSES + ['ready']
+# Every order whose portions are gone from the day's stock; picked up food has left the counter for good
+STOCK_STATUSES = RESERVED_STATUSES + ['picked']
+
+
+def stock_levels_cache_key(day):
+    return f'canteen:stock_levels:{day.isoformat()}'
+
+
+def get_stock_levels(day):
+    """Return {dish_id: remaining portions} for every dish with tracked stock on a date"""
+    key = stock_levels_cache_key(day)
+    levels = cache.get(key)
+    if levels is None:
+        levels = dict(DailyStock.objects.filter(date=day).values_list('dish_id', 'remaining'))
+        cache.set(key, levels, STOCK_LEVELS_TIMEOUT)
+    return levels
+
+
+def invalidate_stock_levels(day):
+    cache.delete(stock_levels_cache_key(day))
+
+
+def reserve_stock(dish, day, quantity):
+    """Atomically take portions from a date's stock, returning False if there are not enough.
+
+    The conditional UPDATE only matches while enough portions remain, so two
+    concurrent bookings can never both take the last portion.
+    """
+    taken = DailyStock.objects.filter(dish=dish, date=day, remaining__gte=quantity).update(
+        remaining=F('remaining') - quantity
+    )
+    if taken:
+        invalidate_stock_levels(day)
+        return True
+    # Nothing matched: either the stock ran out or this dish is not tracked for the date
+    return not DailyStock.objects.filter(dish=dish, date=day).exists()
+
+
+def release_stock(dish_id, day, quantity):
+    """Give portions of a cancelled order back to the date's stock"""
+    restored = DailyStock.objects.filter(dish_id=dish_id, date=day).update(
+        remaining=F('remaining') + quantity
+    )
+    if restored:
+        invalidate_stock_levels(day)
+
+
+def set_stock(dish, day, quantity):
+    """Set the portions prepared for a date, keeping portions that are already booked"""
+    booked = PreOrder.objects.filter(
+        dish=dish, date=day, status__in=STOCK_STATUSES
+    ).aggregate(total=Sum('quantity'))['total'] or 0
+    stock, _ = DailyStock.objects.update_or_create(
+        dish=dish, date=day,
+        defaults={'quantity': quantity, 'remaining': max(quantity - booked, 0)},
+    )
+    invalidate_stock_levels(day)
+    return stock
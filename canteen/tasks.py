@@ -0,0 +1,158 @@
+"""
+A small database-backed task queue.
+
+Requests call enqueue() (or some_task.delay()), which only inserts a
+BackgroundTask row inside the caller's transaction. The run_worker management
+command claims due rows, runs the registered function and retries failures
+with exponential backoff.
+"""
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackgroundTask
+
+_registry = {}
+
+
+def task(func=None, *, max_attempts=5):
+    """Register a function as a task; it gains .delay(**payload) to enqueue it"""
+    def register(func):
+        name = f'{func.__module__}.{func.__name__}'
+        _registry[name] = func
+        func.task_name = name
+
+        def delay(delay=0, unique=False, **payload):
+            return enqueue(name, payload, delay=delay, max_attempts=max_attempts, unique=unique)
+        func.delay = delay
+        return func
+    return register(func) if func else register
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=5, unique=False):
+    """Insert a task row to run after delay seconds.
+
+    With unique=True nothing is added while an identical task is still
+    pending, which turns repeated triggers into a single run.
+    """
+    payload = payload or {}
+    if unique:
+        pending = BackgroundTask.objects.filter(name=name, payload=payload, status='pending').first()
+        if pending:
+            return pending
+    return BackgroundTask.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter, capped at CANTEEN_TASK_MAX_RETRY_DELAY seconds"""
+    base = settings.CANTEEN_TASK_RETRY_DELAY * 2 ** (attempts - 1)
+    return min(base, settings.CANTEEN_TASK_MAX_RETRY_DELAY) * random.uniform(0.5, 1.0)
+
+
+def recover_stale_tasks():
+    """Put back tasks whose worker died mid-run; the interrupted run counts as an attempt"""
+    cutoff = timezone.now() - timedelta(seconds=settings.CANTEEN_TASK_TIMEOUT)
+    stale = BackgroundTask.objects.filter(status='running', locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_by='', last_error='Worker timed out'
+    )
+    return failed + stale.update(status='pending', locked_by='', locked_at=None)
+
+
+def claim_tasks(worker_id, limit):
+    """Mark up to limit due tasks as running for this worker and return them.
+
+    The conditional UPDATE only takes rows that are still pending, so two
+    workers polling together never run the same task.
+    """
+    now = timezone.now()
+    due = list(
+        BackgroundTask.objects.filter(status='pending', run_at__lte=now)
+        .order_by('run_at').values_list('id', flat=True)[:limit]
+    )
+    if not due:
+        return []
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'[:64]
+    BackgroundTask.objects.filter(id__in=due, status='pending').update(
+        status='running', locked_by=token, locked_at=now, attempts=F('attempts') + 1
+    )
+    return list(BackgroundTask.objects.filter(locked_by=token, status='running').order_by('run_at'))
+
+
+def run_task(background_task):
+    """Run one claimed task, recording success, a scheduled retry or the final failure"""
+    func = _registry.get(background_task.name)
+    try:
+        if func is None:
+            raise LookupError(f'No task registered as {background_task.name}')
+        func(**background_task.payload)
+    except Exception:
+        background_task.last_error = traceback.format_exc()[-4000:]
+        if background_task.attempts >= background_task.max_attempts:
+            background_task.status = 'failed'
+        else:
+            background_task.status = 'pending'
+            background_task.run_at = timezone.now() + timedelta(seconds=retry_delay(background_task.attempts))
+    else:
+        background_task.status = 'done'
+        background_task.last_error = ''
+    background_task.locked_by = ''
+    background_task.locked_at = None
+    background_task.save(update_fields=['status', 'run_at', 'last_error', 'locked_by', 'locked_at', 'updated_at'])
+    return background_task.status == 'done'
+
+
+def purge_finished_tasks(days):
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = BackgroundTask.objects.filter(status='done', updated_at__lt=cutoff).delete()
+    return deleted
+
+
+# Tasks
+
+@task
+def resize_dish_image(dish_id):
+    """Shrink an uploaded dish photo in place to at most CANTEEN_DISH_IMAGE_MAX_SIZE pixels"""
+    from io import BytesIO
+
+    from django.core.files.base import ContentFile
+    from PIL import Image
+
+    from .models import Dish
+
+    dish = Dish.objects.filter(pk=dish_id).only('image').first()
+    if dish is None or not dish.image:
+        return
+    max_size = settings.CANTEEN_DISH_IMAGE_MAX_SIZE
+    with dish.image.open('rb') as source:
+        image = Image.open(source)
+        image.load()
+    if max(image.size) <= max_size:
+        return
+
+    image_format = image.format or 'JPEG'
+    image.thumbnail((max_size, max_size))
+    output = BytesIO()
+    image.save(output, format=image_format, quality=85, optimize=True)
+
+    storage, name = dish.image.storage, dish.image.name
+    storage.delete(name)
+    storage.save(name, ContentFile(output.getvalue()))
+
+
+@task(max_attempts=3)
+def refresh_recommendations():
+    """Rebuild the precomputed recommendation tables"""
+    from .recommendations import build_recommendations
+
+    build_recommendations()
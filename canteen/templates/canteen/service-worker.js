@@ -0,0 +1,120 @@
+// Campus Canteen service worker.
+// Menu pages come from the network, or from the cache when the network is
+// slow or down; a cached page, tagged with a sw-cache Server-Timing entry, then
+// asks api/menu/changes/ for the few dishes that changed since it was built.
+// Dish photos and CDN assets are cached on first use.
+const CACHE_VERSION = '{{ cache_version|escapejs }}';
+const SHELL_CACHE = 'canteen-shell-' + CACHE_VERSION;
+const IMAGE_CACHE = 'canteen-images-' + CACHE_VERSION;
+const MENU_URL = '{{ menu_url|escapejs }}';
+const MEDIA_URL = '{{ media_url|escapejs }}';
+const MAX_IMAGES = 150;
+const NETWORK_TIMEOUT = 3000;  // Milliseconds before a slow menu request falls back to the cached page
+const PRECACHE = [
+    MENU_URL,
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+];
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE).then(cache => cache.addAll(PRECACHE)).then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('canteen-') && key !== SHELL_CACHE && key !== IMAGE_CACHE)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+function isMenuPage(url) {
+    return url.origin === self.location.origin && url.pathname === MENU_URL;
+}
+
+// Tags a page served from the cache, which the page reads from its navigation timing
+function markCached(response) {
+    if (!response) {
+        return response;
+    }
+    const headers = new Headers(response.headers);
+    headers.append('Server-Timing', 'sw-cache');
+    return new Response(response.body, {status: response.status, statusText: response.statusText, headers: headers});
+}
+
+// The network copy when it arrives in time, otherwise the cached one; either way the cache is refreshed
+function networkFirst(request) {
+    return caches.open(SHELL_CACHE).then(cache => {
+        const network = fetch(request).then(response => {
+            if (response.ok) {
+                cache.put(request, response.clone());
+            }
+            return response;
+        });
+        const timeout = new Promise(resolve => setTimeout(resolve, NETWORK_TIMEOUT));
+        const cachedAfterTimeout = timeout.then(() => cache.match(request)).then(markCached);
+        return Promise.race([network, cachedAfterTimeout.then(cached => cached || network)])
+            .catch(() => cache.match(request).then(cached => cached || cache.match(MENU_URL)).then(markCached));
+    });
+}
+
+function cacheFirst(request, cacheName) {
+    return caches.open(cacheName).then(cache => cache.match(request).then(cached => {
+        if (cached) {
+            return cached;
+        }
+        return fetch(request).then(response => {
+            if (response.ok || response.type === 'opaque') {
+                cache.put(request, response.clone());
+                if (cacheName === IMAGE_CACHE) {
+                    trimCache(cache, MAX_IMAGES);
+                }
+            }
+            return response;
+        });
+    }));
+}
+
+function trimCache(cache, maxEntries) {
+    cache.keys().then(keys => {
+        keys.slice(0, Math.max(keys.length - maxEntries, 0)).forEach(key => cache.delete(key));
+    });
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') {
+        return;
+    }
+    const url = new URL(request.url);
+
+    if (request.mode === 'navigate') {
+        if (isMenuPage(url)) {
+            event.respondWith(networkFirst(request));
+        } else if (url.origin === self.location.origin) {
+            // Other pages always come from the network; offline, fall back to the menu
+            event.respondWith(fetch(request).catch(
+                () => caches.match(request).then(cached => cached || caches.match(MENU_URL)).then(markCached)
+            ));
+        }
+        return;
+    }
+    if (url.origin === self.location.origin && url.pathname.startsWith(MEDIA_URL)) {
+        event.respondWith(cacheFirst(request, IMAGE_CACHE));
+    } else if (PRECACHE.includes(request.url)) {
+        event.respondWith(cacheFirst(request, SHELL_CACHE));
+    }
+});
+
+// Sent on logout so the next person on a shared device never sees a cached page
+self.addEventListener('message', event => {
+    if (event.data === 'clear-pages') {
+        event.waitUntil(caches.delete(SHELL_CACHE));
+    }
+});
@@ -0,0 +1,29 @@
+from functools import lru_cache
+
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+MAX_STARS = 5
+
+
+@lru_cache(maxsize=None)
+def _stars_html(full, full_class, empty_class):
+    full_icon = f'<i class="fas fa-star{" " + full_class if full_class else ""}"></i>'
+    empty_icon = f'<i class="far fa-star{" " + empty_class if empty_class else ""}"></i>'
+    return mark_safe(full_icon * full + empty_icon * (MAX_STARS - full))
+
+
+@register.simple_tag
+def star_rating(value, full_class='', empty_class=''):
+    """Five star icons, filled up to the whole number of stars in value.
+
+    The markup for each star count is built once and reused, replacing a
+    five-iteration {% for %}/{% if %} loop per rating.
+    """
+    try:
+        full = int(float(value or 0))
+    except (TypeError, ValueError):
+        full = 0
+    return _stars_html(max(0, min(full, MAX_STARS)), full_class, empty_class)
@@ -1,3 +1,422 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import UserProfile
+
+from .booking import BookingError, cancel_preorder, change_status, place_preorder
+from .forms import PreOrderForm
+from .models import (
+    BackgroundTask, Canteen, Category, DailyStock, Dish, Notification, OrderStatusEvent, PickupSlot, PreOrder, Review,
+    UserRecommendation, WaitlistEntry,
+)
+from .kitchen import get_batches
+from .menu import MENU_REMOVED_KEY, changes_version
+from .notifications import MAX_SEND_ATTEMPTS, dispatch_notifications
+from .recommendations import build_recommendations
+from .stock import release_stock, reserve_stock, set_stock
+from .waitlist import join_waitlist
+
+
+def create_lunch(max_orders=10):
+    """An outlet serving one dish in one pickup slot, returning (dish, slot)"""
+    canteen = Canteen.objects.create(name='Main Canteen', slug='main-canteen')
+    category = Category.objects.create(name='Lunch')
+    slot = PickupSlot.objects.create(canteen=canteen, start_time=time(13, 0), end_time=time(13, 30), max_orders=max_orders)
+    dish = Dish.objects.create(
+        canteen=canteen, name='Veg Biryani', description='', category=category, dish_type='veg', price=Decimal('80.00')
+    )
+    return dish, slot
+
+
+class AdminChangelistQueryTests(TestCase):
+    """The PreOrder and Review changelists run the same queries however many rows there are"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.category = Category.objects.create(name='Meals')
+        cls.canteen = Canteen.objects.create(name='North Block', slug='north-block')
+        cls.slot = PickupSlot.objects.create(canteen=cls.canteen, start_time=time(12, 0), end_time=time(12, 30), max_orders=1000)
+        cls.rows = 0
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        """Orders and reviews from new students for new dishes, so every row has distinct relations"""
+        start = self.rows
+        self.rows += count
+        users = User.objects.bulk_create([User(username=f'student{i}') for i in range(start, self.rows)])
+        dishes = Dish.objects.bulk_create([
+            Dish(canteen=self.canteen, name=f'Dish {i}', description='', category=self.category, dish_type='veg', price=Decimal('50.00'))
+            for i in range(start, self.rows)
+        ])
+        PreOrder.objects.bulk_create([
+            PreOrder(
+                canteen=self.canteen, user=user, dish=dish, quantity=1, pickup_slot=self.slot, date=date.today() + timedelta(days=i % 5),
+                total_amount=dish.price, order_number=f'ORD{start + i:05d}',
+            )
+            for i, (user, dish) in enumerate(zip(users, dishes))
+        ])
+        Review.objects.bulk_create([Review(user=user, dish=dish, rating=4) for user, dish in zip(users, dishes)])
+
+    def count_changelist_queries(self, model_name, query=''):
+        url = reverse(f'admin:canteen_{model_name}_changelist') + query
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, model_name, query=''):
+        self.add_rows(5)
+        self.count_changelist_queries(model_name, query)  # Fill the per-process caches first
+        small = self.count_changelist_queries(model_name, query)
+        self.add_rows(150)
+        self.assertEqual(self.count_changelist_queries(model_name, query), small)
+
+    def test_preorder_changelist(self):
+        self.assert_constant_queries('preorder')
+
+    def test_preorder_changelist_filtered(self):
+        self.assert_constant_queries('preorder', '?status__exact=pending&q=ORD00001')
+
+    def test_review_changelist(self):
+        self.assert_constant_queries('review')
+
+
+class AdminStatusAuditTests(TestCase):
+    """Status edits from the PreOrder changelist commit together with their audit events"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        canteen = Canteen.objects.create(name='North Block', slug='north-block')
+        category = Category.objects.create(name='Meals')
+        slot = PickupSlot.objects.create(canteen=canteen, start_time=time(12, 0), end_time=time(12, 30), max_orders=10)
+        cls.dish = Dish.objects.create(canteen=canteen, name='Thali', description='', category=category, dish_type='veg', price=Decimal('50.00'))
+        cls.order = PreOrder.objects.create(user=cls.admin, dish=cls.dish, quantity=1, pickup_slot=slot, date=date.today(), total_amount=cls.dish.price)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def edit_status(self, status):
+        return self.client.post(reverse('admin:canteen_preorder_changelist'), {
+            'form-TOTAL_FORMS': '1',
+            'form-INITIAL_FORMS': '1',
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+            'form-0-id': str(self.order.pk),
+            'form-0-status': status,
+            '_save': 'Save',
+        })
+
+    def test_status_edit_records_event(self):
+        self.assertEqual(self.edit_status('confirmed').status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'confirmed')
+        event = OrderStatusEvent.objects.get(preorder_id=self.order.pk)
+        self.assertEqual((event.from_status, event.to_status), ('pending', 'confirmed'))
+
+    def test_failed_event_write_rolls_back_edit(self):
+        with mock.patch('canteen.audit.write_events', side_effect=DatabaseError('disk full')):
+            with self.assertRaises(DatabaseError):
+                self.edit_status('confirmed')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+    def test_cancel_releases_stock(self):
+        set_stock(self.dish, date.today(), 5)
+        self.edit_status('cancelled')
+        self.assertEqual(DailyStock.objects.get(dish=self.dish).remaining, 5)
+
+    def test_reopen_refused_without_portions(self):
+        self.order.status = 'cancelled'
+        self.order.save()
+        set_stock(self.dish, date.today(), 0)
+        self.edit_status('pending')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'cancelled')
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+
+class NotificationDispatchTests(TestCase):
+    """Failed sends are backed off and a dispatch is queued for when they are due"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+
+    def add_notification(self, recipient, **fields):
+        return Notification.objects.create(
+            user=self.student, kind='order_ready', recipient=recipient, subject='Order ready', body='Your order is ready', **fields
+        )
+
+    def fail_sending_to(self, recipient):
+        real_send = EmailMessage.send
+
+        def send(message, *args, **kwargs):
+            if recipient in message.to:
+                raise ConnectionError('mail server down')
+            return real_send(message, *args, **kwargs)
+        return mock.patch.object(EmailMessage, 'send', autospec=True, side_effect=send)
+
+    def test_mixed_batch_queues_retry(self):
+        sent = self.add_notification('sent@example.com')
+        failed = self.add_notification('failed@example.com')
+        with self.fail_sending_to('failed@example.com'):
+            self.assertEqual(dispatch_notifications(), (1, 1))
+
+        sent.refresh_from_db()
+        failed.refresh_from_db()
+        self.assertEqual(sent.status, 'sent')
+        self.assertEqual((failed.status, failed.attempts), ('pending', 1))
+        self.assertGreater(failed.next_attempt_at, timezone.now())
+        retry = BackgroundTask.objects.get(name=dispatch_notifications.task_name, status='pending')
+        self.assertLess(abs((retry.run_at - failed.next_attempt_at).total_seconds()), 5)
+
+        # Not due yet, so running again straight away sends nothing
+        self.assertEqual(dispatch_notifications(), (0, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_backed_off_notification_sent_when_due(self):
+        notification = self.add_notification('late@example.com', attempts=1, next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(dispatch_notifications(), (1, 0))
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('sent', 2))
+
+    def test_gives_up_after_max_attempts(self):
+        notification = self.add_notification('failed@example.com', attempts=MAX_SEND_ATTEMPTS - 1)
+        with self.fail_sending_to('failed@example.com'):
+            self.assertEqual(dispatch_notifications(), (0, 1))
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'failed')
+        self.assertFalse(BackgroundTask.objects.filter(status='pending').exists())
+
+
+class StockTests(TestCase):
+    """Portions are taken with a conditional UPDATE and only given back by orders still holding them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'password')
+        UserProfile.objects.create(user=cls.staff, role='staff')
+        cls.dish, cls.slot = create_lunch()
+        cls.day = date.today() + timedelta(days=1)
+
+    def add_order(self, status='pending', quantity=2):
+        return PreOrder.objects.create(
+            user=self.student, dish=self.dish, quantity=quantity, pickup_slot=self.slot, date=self.day,
+            status=status, total_amount=self.dish.price * quantity,
+        )
+
+    def remaining(self):
+        return DailyStock.objects.get(dish=self.dish, date=self.day).remaining
+
+    def test_reserve_never_oversells(self):
+        set_stock(self.dish, self.day, 3)
+        self.assertTrue(reserve_stock(self.dish, self.day, 2))
+        self.assertFalse(reserve_stock(self.dish, self.day, 2))
+        self.assertEqual(self.remaining(), 1)
+        release_stock(self.dish.id, self.day, 2)
+        self.assertEqual(self.remaining(), 3)
+
+    def test_untracked_dish_is_not_limited(self):
+        self.assertTrue(reserve_stock(self.dish, self.day, 100))
+        self.assertFalse(DailyStock.objects.exists())
+
+    def test_set_stock_counts_picked_orders(self):
+        self.add_order('picked')
+        self.add_order('pending')
+        self.add_order('cancelled')
+        set_stock(self.dish, self.day, 10)
+        self.assertEqual(self.remaining(), 6)
+
+    def test_cancel_releases_reserved_portions(self):
+        order = self.add_order('confirmed')
+        set_stock(self.dish, self.day, 10)
+        change_status(order, 'cancelled', self.staff)
+        self.assertEqual(self.remaining(), 10)
+
+    def test_cancel_picked_order_keeps_stock(self):
+        order = self.add_order('picked')
+        set_stock(self.dish, self.day, 10)
+        change_status(order, 'cancelled', self.staff)
+        self.assertEqual(self.remaining(), 8)
+
+    def test_reopen_reserves_again(self):
+        order = self.add_order('cancelled')
+        set_stock(self.dish, self.day, 3)
+        change_status(order, 'pending', self.staff)
+        self.assertEqual(self.remaining(), 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'pending')
+
+    def test_reopen_refused_without_portions(self):
+        order = self.add_order('cancelled')
+        set_stock(self.dish, self.day, 1)
+        with self.assertRaises(BookingError):
+            change_status(order, 'ready', self.staff)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'cancelled')
+        self.assertEqual(self.remaining(), 1)
+
+    def test_unpicking_does_not_reserve_twice(self):
+        order = self.add_order('picked')
+        set_stock(self.dish, self.day, 10)
+        change_status(order, 'ready', self.staff)
+        self.assertEqual(self.remaining(), 8)
+
+    def test_manage_preorders_rejects_unknown_status(self):
+        order = self.add_order('pending')
+        self.client.force_login(self.staff)
+        self.client.post(reverse('canteen:manage_preorders'), {'order_id': order.id, 'status': 'bogus'})
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'pending')
+        self.assertFalse(OrderStatusEvent.objects.exists())
+
+
+class IdempotencyTests(TestCase):
+    """A repeated booking with the same idempotency key returns the first order"""
+
+    def setUp(self):
+        self.dish, self.slot = create_lunch()
+        self.user = User.objects.create_user('student', password='x')
+        self.day = date.today() + timedelta(days=1)
+        set_stock(self.dish, self.day, 10)
+
+    def form_data(self):
+        return {'quantity': 2, 'pickup_slot': self.slot.pk, 'date': self.day.isoformat(), 'idempotency_key': 'abc123'}
+
+    def valid_form(self):
+        form = PreOrderForm(self.form_data(), dish=self.dish)
+        self.assertTrue(form.is_valid(), form.errors)
+        return form
+
+    def assert_booked_once(self):
+        self.assertEqual(PreOrder.objects.count(), 1)
+        self.assertEqual(DailyStock.objects.get(dish=self.dish).remaining, 8)
+
+    def test_double_submit_creates_one_order(self):
+        self.client.force_login(self.user)
+        for _ in range(2):
+            response = self.client.post(reverse('canteen:prebook_dish', args=[self.dish.pk]), self.form_data())
+            self.assertRedirects(response, reverse('canteen:dashboard'), fetch_redirect_response=False)
+        self.assert_booked_once()
+
+    def test_concurrent_duplicate_returns_original(self):
+        # Both requests passed the find_order check before either was saved
+        first, created = place_preorder(self.user, self.dish, self.valid_form(), 'abc123')
+        self.assertTrue(created)
+        second, created = place_preorder(self.user, self.dish, self.valid_form(), 'abc123')
+        self.assertFalse(created)
+        self.assertEqual(second.pk, first.pk)
+        self.assert_booked_once()
+
+
+class WaitlistTests(TestCase):
+    """A cancellation in a full slot books the student who joined its waitlist first"""
+
+    def setUp(self):
+        self.dish, self.slot = create_lunch(max_orders=1)
+        self.day = date.today() + timedelta(days=1)
+        self.order = PreOrder.objects.create(
+            user=User.objects.create_user('booked', password='x'), dish=self.dish, quantity=1, pickup_slot=self.slot,
+            date=self.day, total_amount=self.dish.price,
+        )
+        self.first = User.objects.create_user('first', password='x')
+        self.second = User.objects.create_user('second', password='x')
+        join_waitlist(self.first, self.dish, self.slot, self.day, 2)
+        join_waitlist(self.second, self.dish, self.slot, self.day, 1)
+
+    def test_cancel_promotes_first_in_line(self):
+        self.assertTrue(cancel_preorder(self.order))
+        promoted = PreOrder.objects.get(user=self.first)
+        self.assertEqual((promoted.status, promoted.quantity, promoted.pickup_slot), ('pending', 2, self.slot))
+        self.assertEqual(WaitlistEntry.objects.get(user=self.first).preorder, promoted)
+        self.assertEqual(WaitlistEntry.objects.get(user=self.second).status, 'waiting')
+        self.assertFalse(PreOrder.objects.filter(user=self.second).exists())
+
+    def test_sold_out_entry_skipped(self):
+        set_stock(self.dish, self.day, 1)  # The cancelled portion is all there is: too few for the first in line
+        cancel_preorder(self.order)
+        self.assertEqual(WaitlistEntry.objects.get(user=self.first).status, 'skipped')
+        self.assertEqual(PreOrder.objects.get(user=self.second).status, 'pending')
+
+
+class KitchenBatchTests(TestCase):
+    @override_settings(CANTEEN_KITCHEN_BATCH_PORTIONS=10)
+    def test_split_batches_count_their_own_orders(self):
+        dish, slot = create_lunch(max_orders=20)
+        user = User.objects.create_user('student', password='x')
+        for quantity in [3, 25, 2, 1]:
+            PreOrder.objects.create(
+                user=user, dish=dish, quantity=quantity, pickup_slot=slot, date=date.today(), status='confirmed',
+                total_amount=dish.price * quantity,
+            )
+        batches = get_batches(date.today())
+        self.assertEqual([(batch['portions'], batch['orders']) for batch in batches], [(10, 2), (10, 1), (10, 2), (1, 1)])
+
+
+class MenuChangesTests(TestCase):
+    """The delta sync only sends the ids on the menu when a dish left it after the client's version"""
+
+    def setUp(self):
+        cache.clear()
+        self.dish, _ = create_lunch()
+        self.since = changes_version(timezone.now() - timedelta(seconds=10))
+        cache.set(f'{MENU_REMOVED_KEY}:{self.dish.canteen_id}', timezone.now() - timedelta(minutes=1), None)
+
+    def sync(self):
+        return self.client.get(reverse('canteen:api_menu_changes'), {'canteen': 'main-canteen', 'since': self.since}).json()
+
+    def test_no_ids_without_removal(self):
+        self.assertNotIn('dish_ids', self.sync())
+
+    def test_ids_after_withdrawal(self):
+        self.dish.is_available = False
+        self.dish.save()
+        data = self.sync()
+        self.assertEqual(data['dish_ids'], [])
+        self.assertEqual([dish['id'] for dish in data['changed']], [self.dish.id])
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.biryani, _ = create_lunch()
+        self.paneer = Dish.objects.create(
+            canteen=self.biryani.canteen, name='Paneer Tikka', description='', category=self.biryani.category,
+            dish_type='veg', price=Decimal('90.00'),
+        )
+        fan = User.objects.create_user('fan', password='x')
+        Review.objects.create(user=fan, dish=self.biryani, rating=5)
+        Review.objects.create(user=fan, dish=self.paneer, rating=5)
+
+    def recommended_to(self, user):
+        return list(UserRecommendation.objects.filter(user=user).values_list('dish_id', flat=True))
+
+    def test_similar_dish_recommended(self):
+        newcomer = User.objects.create_user('newcomer', password='x')
+        Review.objects.create(user=newcomer, dish=self.biryani, rating=5)
+        build_recommendations()
+        self.assertEqual(self.recommended_to(newcomer), [self.paneer.id])
+
+    def test_disliked_dish_not_recommended(self):
+        critic = User.objects.create_user('critic', password='x')
+        Review.objects.create(user=critic, dish=self.biryani, rating=5)
+        Review.objects.create(user=critic, dish=self.paneer, rating=1)
+        build_recommendations()
+        self.assertEqual(self.recommended_to(critic), [])
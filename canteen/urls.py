@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'canteen'
 
@@ -9,8 +9,24 @@ urlpatterns = [
     path('prebook/<int:dish_id>/', views.prebook_dish, name='prebook_dish'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('cancel-order/<int:order_id>/', views.cancel_preorder, name='cancel_preorder'),
+    path('waitlist/<int:entry_id>/leave/', views.leave_waitlist_entry, name='leave_waitlist'),
+    path('order/<str:order_number>/qr.svg', views.order_qr, name='order_qr'),
+    path('api/slots/', views.slot_availability, name='slot_availability'),
+    path('service-worker.js', views.service_worker, name='service_worker'),
+    path('manifest.webmanifest', views.web_manifest, name='web_manifest'),
+    
+    # JSON API
+    path('api/menu/', api.menu, name='api_menu'),
+    path('api/menu/changes/', api.menu_changes, name='api_menu_changes'),
+    path('api/dishes/<int:pk>/', api.dish_detail, name='api_dish_detail'),
+    path('api/orders/', api.orders, name='api_orders'),
+    path('api/orders/<str:order_number>/', api.order_detail, name='api_order_detail'),
+    path('api/orders/<str:order_number>/cancel/', api.order_cancel, name='api_order_cancel'),
     
     # Staff/Admin URLs
     path('admin/dishes/', views.manage_dishes, name='manage_dishes'),
     path('admin/preorders/', views.manage_preorders, name='manage_preorders'),
+    path('admin/pickup/', views.pickup_counter, name='pickup_counter'),
+    path('admin/kitchen/', views.kitchen_schedule, name='kitchen_schedule'),
+    path('admin/profiles/', views.request_profiles, name='request_profiles'),
 ]
\ No newline at end of file
@@ -1,59 +1,96 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.conf import settings
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Avg
+from django.db import transaction
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
 from django.views.decorators.http import require_POST
+from django.utils import timezone
 from datetime import date, timedelta
+from functools import wraps
 from django.contrib.auth import logout
 
-from .models import Dish, Category, Review, PreOrder, PickupSlot
+from .models import ArchivedPreOrder, Dish, Review, PreOrder, PickupSlot, DishRecommendation, UserRecommendation, WaitlistEntry
 from .forms import ReviewForm, PreOrderForm
+from . import booking
+from .audit import record_status_change
+from .booking import BookingError, place_preorder
+from .connections import connection_stats
+from .idempotency import find_order, get_request_key
+from .notifications import queue_order_ready
+from .menu import CARD_CACHE_TIMEOUT, MENU_PER_PAGE, get_published_menu, search_menu
+from .kitchen import build_kitchen_schedule
+from .outlets import current_outlet_id
+from .profiling import load_profile, load_profiles, profile_dir
+from .qr import get_order_qr_svg
+from .stock import LOW_STOCK_THRESHOLD, get_stock_levels, set_stock
+from .slots import get_slot_loads, suggest_slot
+from .waitlist import join_waitlist, leave_waitlist, queue_positions
+from .reviews import DEFAULT_REVIEW_SORT, REVIEW_ORDERINGS, get_rating_summary, get_review_page
 from accounts.models import UserProfile
 
 
+def staff_member_required(view_func):
+    """Restrict a view to users whose profile has a staff or admin role"""
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        try:
+            profile = UserProfile.objects.get(user=request.user)
+            if not profile.is_staff_member:
+                messages.error(request, 'Access denied. Staff only.')
+                return redirect('canteen:menu')
+        except UserProfile.DoesNotExist:
+            messages.error(request, 'Access denied.')
+            return redirect('canteen:menu')
+        return view_func(request, *args, **kwargs)
+    return login_required(_wrapped)
+
+
 def menu(request):
-    """Display the daily menu with search and filter options"""
-    dishes = Dish.objects.filter(is_available=True).select_related('category')
-    categories = Category.objects.filter(is_active=True)
+    """Display the daily menu of the outlet being browsed with search and filter options"""
+    canteen_id = current_outlet_id(request)
+    menu = get_published_menu(canteen_id)
     
-    # Search functionality
+    # Search and filter options
     search_query = request.GET.get('search', '')
-    if search_query:
-        dishes = dishes.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(ingredients__icontains=search_query)
-        )
-    
-    # Filter by category
     category_filter = request.GET.get('category', '')
-    if category_filter:
-        dishes = dishes.filter(category__id=category_filter)
-    
-    # Filter by dish type
     dish_type_filter = request.GET.get('dish_type', '')
-    if dish_type_filter:
-        dishes = dishes.filter(dish_type=dish_type_filter)
     
     # Sort options
     sort_by = request.GET.get('sort', 'name')
-    if sort_by == 'price':
-        dishes = dishes.order_by('price')
-    elif sort_by == 'rating':
-        dishes = dishes.annotate(avg_rating=Avg('review__rating')).order_by('-avg_rating')
-    else:
-        dishes = dishes.order_by('name')
+    
+    # Filtering and sorting run on the in-memory published menu, not the database
+    dishes = search_menu(menu, search_query, category_filter, dish_type_filter, sort_by)
     
     # Pagination
-    paginator = Paginator(dishes, 12)  # 12 dishes per page
+    paginator = Paginator(dishes, MENU_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
+    # Menu shows what is left for the next bookable day from the cached stock counts
+    stock_date = date.today() + timedelta(days=1)
+    stock_levels = get_stock_levels(stock_date)
+    page_obj.object_list = [dict(dish, stock_remaining=stock_levels.get(dish['id'])) for dish in page_obj]
+    
+    # Personalised suggestions on the unfiltered first page, one indexed lookup
+    recommended_dishes = []
+    if request.user.is_authenticated and not (search_query or category_filter or dish_type_filter or page_number):
+        recommended_dishes = [
+            rec.dish for rec in UserRecommendation.objects.filter(
+                user=request.user, dish__is_available=True, dish__canteen_id=canteen_id
+            ).select_related('dish')[:4]
+        ]
+    
     context = {
         'page_obj': page_obj,
-        'categories': categories,
+        'card_cache_timeout': CARD_CACHE_TIMEOUT,
+        'recommended_dishes': recommended_dishes,
+        'stock_date': stock_date,
+        'low_stock_threshold': LOW_STOCK_THRESHOLD,
+        'categories': menu['categories'],
+        'changes_version': menu['changes_version'],
         'search_query': search_query,
         'category_filter': category_filter,
         'dish_type_filter': dish_type_filter,
@@ -65,32 +102,20 @@ def menu(request):
 def dish_detail(request, pk):
     """Display dish details with reviews and pre-order option"""
     dish = get_object_or_404(Dish, pk=pk)
-    reviews = Review.objects.filter(dish=dish).select_related('user')
     user_review = None
     
     if request.user.is_authenticated:
-        try:
-            user_review = Review.objects.get(dish=dish, user=request.user)
-        except Review.DoesNotExist:
-            pass
+        user_review = Review.objects.filter(dish=dish, user=request.user).first()
     
     # Handle review submission
     if request.method == 'POST' and request.user.is_authenticated:
         if 'review_submit' in request.POST:
-            review_form = ReviewForm(request.POST)
+            review_form = ReviewForm(request.POST, instance=user_review)
             if review_form.is_valid():
-                review, created = Review.objects.get_or_create(
-                    dish=dish,
-                    user=request.user,
-                    defaults={
-                        'rating': review_form.cleaned_data['rating'],
-                        'comment': review_form.cleaned_data['comment']
-                    }
-                )
-                if not created:
-                    review.rating = review_form.cleaned_data['rating']
-                    review.comment = review_form.cleaned_data['comment']
-                    review.save()
+                review = review_form.save(commit=False)
+                review.dish = dish
+                review.user = request.user
+                review.save()
                 
                 messages.success(request, 'Review submitted successfully!')
                 return redirect('canteen:dish_detail', pk=pk)
@@ -99,9 +124,25 @@ def dish_detail(request, pk):
     if user_review:
         review_form = ReviewForm(instance=user_review)
     
+    review_page = get_review_page(
+        dish,
+        sort=request.GET.get('review_sort', DEFAULT_REVIEW_SORT),
+        cursor=request.GET.get('cursor'),
+    )
+    
+    also_like = [
+        rec.recommended for rec in DishRecommendation.objects.filter(
+            dish=dish, recommended__is_available=True, recommended__canteen_id=dish.canteen_id
+        ).select_related('recommended')[:4]
+    ]
+    
     context = {
         'dish': dish,
-        'reviews': reviews,
+        'also_like': also_like,
+        'reviews': review_page['reviews'],
+        'review_page': review_page,
+        'review_sort_choices': REVIEW_ORDERINGS.keys(),
+        'rating_summary': get_rating_summary(dish),
         'user_review': user_review,
         'review_form': review_form,
     }
@@ -112,59 +153,173 @@ def dish_detail(request, pk):
 def prebook_dish(request, dish_id):
     """Pre-book a dish for pickup"""
     dish = get_object_or_404(Dish, id=dish_id, is_available=True)
-    pickup_slots = PickupSlot.objects.filter(is_active=True)
     
     if request.method == 'POST':
-        form = PreOrderForm(request.POST)
-        if form.is_valid():
-            preorder = form.save(commit=False)
-            preorder.user = request.user
-            preorder.dish = dish
-            preorder.save()
-            
-            messages.success(request, f'Pre-order placed successfully! Order number: {preorder.order_number}')
+        # A repeated submission returns the original order before any validation or writes
+        idempotency_key = get_request_key(request, request.POST.get('idempotency_key'))
+        existing = find_order(request.user, idempotency_key)
+        if existing:
+            messages.info(request, f'Pre-order already placed. Order number: {existing.order_number}')
+            return redirect('canteen:dashboard')
+        
+        form = PreOrderForm(request.POST, dish=dish)
+        if 'join_waitlist' in request.POST and not form.is_valid() and form.can_join_waitlist():
+            data = form.cleaned_data
+            entry, created = join_waitlist(
+                request.user, dish, form.full_slot, data['date'], data['quantity'], data.get('special_instructions', '')
+            )
+            if created:
+                messages.success(request, f'You are on the waitlist for {entry.pickup_slot} on {entry.date:%b %d}. '
+                                          'We will book your order if a place opens up.')
+            else:
+                messages.info(request, 'You are already on the waitlist for this slot.')
             return redirect('canteen:dashboard')
+        if form.is_valid():
+            try:
+                preorder, created = place_preorder(request.user, dish, form, idempotency_key)
+            except BookingError as error:
+                form.add_error('quantity', str(error))
+            else:
+                if created:
+                    messages.success(request, f'Pre-order placed successfully! Order number: {preorder.order_number}')
+                else:
+                    messages.info(request, f'Pre-order already placed. Order number: {preorder.order_number}')
+                return redirect('canteen:dashboard')
+        load_date = form.cleaned_data.get('date') or date.today() + timedelta(days=1)
     else:
-        form = PreOrderForm()
-        form.fields['date'].initial = date.today() + timedelta(days=1)
+        form = PreOrderForm(dish=dish)
+        load_date = date.today() + timedelta(days=1)
+        form.fields['date'].initial = load_date
+    
+    slot_loads, suggested_slot = form.show_slot_loads(load_date)
     
     context = {
         'dish': dish,
         'form': form,
-        'pickup_slots': pickup_slots,
+        'pickup_slots': slot_loads,
+        'suggested_slot': suggested_slot,
+        'load_date': load_date,
     }
     return render(request, 'canteen/prebook.html', context)
 
 
+def service_worker(request):
+    """The service worker script; served from /canteen/ so it controls every canteen page"""
+    context = {
+        'cache_version': settings.CANTEEN_PWA_CACHE_VERSION,
+        'menu_url': reverse('canteen:menu'),
+        'media_url': settings.MEDIA_URL,
+    }
+    response = render(request, 'canteen/service-worker.js', context, content_type='application/javascript')
+    # Browsers check for a new worker on every navigation; never let a proxy serve an old one
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def web_manifest(request):
+    """Web app manifest so phones can install the canteen as an app"""
+    manifest = {
+        'name': 'Campus Canteen',
+        'short_name': 'Canteen',
+        'start_url': reverse('canteen:menu'),
+        'scope': reverse('canteen:menu'),
+        'display': 'standalone',
+        'background_color': '#f8f9fa',
+        'theme_color': '#2c3e50',
+    }
+    return JsonResponse(manifest, content_type='application/manifest+json')
+
+
+def slot_availability(request):
+    """JSON fill ratios of every pickup slot for a date, with a suggested slot for a dish"""
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        return JsonResponse({'error': 'date must be given as YYYY-MM-DD'}, status=400)
+    
+    dish = None
+    dish_id = request.GET.get('dish')
+    if dish_id:
+        dish = Dish.objects.filter(pk=dish_id).only('canteen_id', 'preparation_time').first() if dish_id.isdigit() else None
+        if dish is None:
+            return JsonResponse({'error': 'Unknown dish'}, status=404)
+    
+    loads = get_slot_loads(day, dish.canteen_id if dish else current_outlet_id(request))
+    suggestion = suggest_slot(day, dish, loads)
+    return JsonResponse({
+        'date': day.isoformat(),
+        'slots': loads,
+        'suggested_slot': suggestion['id'] if suggestion else None,
+    })
+
+
 @login_required
 def dashboard(request):
     """Student dashboard showing their preorders"""
     preorders = PreOrder.objects.filter(user=request.user).select_related('dish', 'pickup_slot')
     
     status_filter = request.GET.get('status', '')
+    
+    # Archived orders are only read when the student asks for their history
+    show_history = request.GET.get('history') == '1'
+    history_page = None
+    if show_history:
+        history = ArchivedPreOrder.objects.filter(user=request.user).select_related('dish', 'pickup_slot')
+        if status_filter:
+            history = history.filter(status=status_filter)
+        history_page = Paginator(history, 20).get_page(request.GET.get('page'))
+    
     if status_filter:
         preorders = preorders.filter(status=status_filter)
     
+    waitlist = list(
+        WaitlistEntry.objects.filter(user=request.user, status='waiting', date__gte=date.today())
+        .select_related('dish', 'pickup_slot').order_by('date', 'created_at')
+    )
+    positions = queue_positions(waitlist)
+    for entry in waitlist:
+        entry.position = positions.get(entry.id)
+    
     context = {
-        'preorders': preorders,
+        'preorders': history_page if show_history else preorders,
+        'waitlist': waitlist,
         'pending_orders': preorders.filter(status='pending'),
         'confirmed_orders': preorders.filter(status='confirmed'),
         'ready_orders': preorders.filter(status='ready'),
         'picked_orders': preorders.filter(status='picked'),
         'status_filter': status_filter,
+        'show_history': show_history,
+        'history_page': history_page,
     }
     return render(request, 'canteen/dashboard.html', context)
 
 
+@login_required
+def order_qr(request, order_number):
+    """Serve the QR code for an order; the image never changes so browsers keep it forever"""
+    is_owner = PreOrder.objects.filter(order_number=order_number, user=request.user).exists()
+    if not is_owner:
+        profile = UserProfile.objects.filter(user=request.user).first()
+        if not (profile and profile.is_staff_member and PreOrder.objects.filter(order_number=order_number).exists()):
+            raise Http404
+    
+    etag = f'"qr-{order_number}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(get_order_qr_svg(order_number), content_type='image/svg+xml')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+
 @login_required
 @require_POST
 def cancel_preorder(request, order_id):
     """Cancel a preorder"""
     preorder = get_object_or_404(PreOrder, id=order_id, user=request.user)
     
-    if preorder.status in ['pending', 'confirmed']:
-        preorder.status = 'cancelled'
-        preorder.save()
+    if booking.cancel_preorder(preorder, request.user):
         messages.success(request, 'Order cancelled successfully!')
     else:
         messages.error(request, 'Cannot cancel this order.')
@@ -173,53 +328,75 @@ def cancel_preorder(request, order_id):
 
 
 @login_required
-def manage_dishes(request):
-    """Staff view to manage dishes and availability"""
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if not profile.is_staff_member:
-            messages.error(request, 'Access denied. Staff only.')
-            return redirect('canteen:menu')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'Access denied.')
-        return redirect('canteen:menu')
+@require_POST
+def leave_waitlist_entry(request, entry_id):
+    """Take the student off a slot's waitlist"""
+    entry = get_object_or_404(WaitlistEntry, id=entry_id, user=request.user)
     
-    dishes = Dish.objects.all().select_related('category')
+    if leave_waitlist(entry):
+        messages.success(request, 'You left the waitlist.')
+    else:
+        messages.info(request, 'This waitlist entry is no longer waiting.')
+    
+    return redirect('canteen:dashboard')
+
+
+@staff_member_required
+def manage_dishes(request):
+    """Staff view to manage the outlet's dishes and availability"""
+    canteen_id = current_outlet_id(request)
+    dishes = Dish.objects.filter(canteen_id=canteen_id).select_related('category')
     
     if request.method == 'POST':
         dish_id = request.POST.get('dish_id')
         action = request.POST.get('action')
         
         if dish_id and action:
-            dish = get_object_or_404(Dish, id=dish_id)
+            dish = get_object_or_404(Dish, id=dish_id, canteen_id=canteen_id)
             if action == 'toggle_availability':
                 dish.is_available = not dish.is_available
                 dish.save()
                 status = "available" if dish.is_available else "sold out"
                 messages.success(request, f'{dish.name} marked as {status}')
+            elif action == 'set_stock':
+                try:
+                    stock_date = date.fromisoformat(request.POST.get('stock_date', ''))
+                    quantity = int(request.POST.get('stock_quantity', ''))
+                    if quantity < 0:
+                        raise ValueError
+                except ValueError:
+                    messages.error(request, 'Enter a date and a stock quantity of zero or more.')
+                else:
+                    stock = set_stock(dish, stock_date, quantity)
+                    messages.success(request, f'{dish.name}: {stock.remaining} of {stock.quantity} portions left for {stock_date:%b %d}')
+    
+    # Stock for the next bookable day, looked up once for the whole table
+    stock_date = date.today() + timedelta(days=1)
+    stock_levels = get_stock_levels(stock_date)
+    for dish in dishes:
+        dish.stock_remaining = stock_levels.get(dish.id)
     
-    return render(request, 'canteen/admin/manage_dishes.html', {'dishes': dishes})
+    context = {
+        'dishes': dishes,
+        'stock_date': stock_date,
+    }
+    return render(request, 'canteen/admin/manage_dishes.html', context)
 
 
-@login_required
+@staff_member_required
 def manage_preorders(request):
-    """Staff view to manage preorders"""
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        if not profile.is_staff_member:
-            messages.error(request, 'Access denied. Staff only.')
-            return redirect('canteen:menu')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'Access denied.')
-        return redirect('canteen:menu')
-    
-    preorders = PreOrder.objects.all().select_related('user', 'dish', 'pickup_slot')
+    """Staff view to manage the outlet's preorders"""
+    canteen_id = current_outlet_id(request)
+    preorders = PreOrder.objects.filter(canteen_id=canteen_id).select_related('user', 'dish', 'pickup_slot')
     
     date_filter = request.GET.get('date', '')
-    if date_filter:
-        preorders = preorders.filter(date=date_filter)
-    else:
-        preorders = preorders.filter(date=date.today())
+    try:
+        day = date.fromisoformat(date_filter) if date_filter else date.today()
+    except ValueError:
+        messages.error(request, 'Enter the date as YYYY-MM-DD.')
+        date_filter = ''
+        day = None
+    preorders = preorders.filter(date=day or date.today())
     
     status_filter = request.GET.get('status', '')
     if status_filter:
@@ -229,11 +406,29 @@ def manage_preorders(request):
         order_id = request.POST.get('order_id')
         new_status = request.POST.get('status')
         
-        if order_id and new_status:
-            preorder = get_object_or_404(PreOrder, id=order_id)
-            preorder.status = new_status
-            preorder.save()
-            messages.success(request, f'Order #{preorder.order_number} status updated to {new_status}')
+        if request.POST.get('action') == 'mark_all_ready' and day is not None:
+            # Every confirmed order of the day at once; emails go out through the outbox afterwards
+            with transaction.atomic():
+                ready = list(
+                    PreOrder.objects.select_for_update()
+                    .filter(canteen_id=canteen_id, date=day, status='confirmed')
+                    .select_related('user', 'dish', 'pickup_slot')
+                )
+                PreOrder.objects.filter(id__in=[order.id for order in ready]).update(status='ready', updated_at=timezone.now())
+                record_status_change(ready, 'ready', request.user)
+                notified = queue_order_ready(ready)
+            messages.success(request, f'{len(ready)} orders marked ready, {notified} students will be notified')
+        elif order_id and new_status:
+            preorder = get_object_or_404(PreOrder.objects.select_related('user', 'dish', 'pickup_slot'), id=order_id, canteen_id=canteen_id)
+            if new_status not in dict(PreOrder.STATUS_CHOICES):
+                messages.error(request, f'Unknown order status "{new_status}".')
+            else:
+                try:
+                    booking.change_status(preorder, new_status, request.user)
+                except BookingError as error:
+                    messages.error(request, str(error))
+                else:
+                    messages.success(request, f'Order #{preorder.order_number} status updated to {new_status}')
     
     context = {
         'preorders': preorders,
@@ -244,6 +439,143 @@ def manage_preorders(request):
     return render(request, 'canteen/admin/manage_preorders.html', context)
 
 
+def _wants_json(request):
+    return request.GET.get('format') == 'json' or 'application/json' in request.headers.get('Accept', '')
+
+
+@staff_member_required
+def pickup_counter(request):
+    """Staff view to hand over the outlet's orders by order number or scanned QR code"""
+    wants_json = _wants_json(request)
+    canteen_id = current_outlet_id(request)
+    
+    if request.method == 'POST':
+        order_number = PreOrder.order_number_from_code(request.POST.get('code'))
+        
+        # Single UPDATE through the unique order_number index; only ready orders can be handed over
+        picked = 0
+        if order_number:
+            with transaction.atomic():
+                picked = PreOrder.objects.filter(order_number=order_number, canteen_id=canteen_id, status='ready').update(
+                    status='picked', updated_at=timezone.now()
+                )
+                if picked:
+                    order = PreOrder.objects.only('order_number', 'dish_id', 'pickup_slot_id', 'date').get(order_number=order_number)
+                    record_status_change([order], 'picked', request.user, from_status='ready')
+        
+        if picked:
+            ok, message = True, f'Order #{order_number} marked as picked up'
+        else:
+            # Only the failure path pays for a second lookup to explain why
+            found = PreOrder.objects.filter(order_number=order_number).values_list('status', 'canteen_id', 'canteen__name').first()
+            ok = False
+            if found is None:
+                message = f'No order found for "{order_number}"'
+            else:
+                status, order_canteen_id, canteen_name = found
+                if order_canteen_id != canteen_id:
+                    message = f'Order #{order_number} is for pickup at {canteen_name}'
+                else:
+                    message = f'Order #{order_number} is {status}, not ready for pickup'
+        
+        if wants_json:
+            return JsonResponse({'ok': ok, 'order_number': order_number, 'message': message},
+                                status=200 if ok else 409)
+        if ok:
+            messages.success(request, message)
+        else:
+            messages.error(request, message)
+        return redirect('canteen:pickup_counter')
+    
+    # Today's queue in one query, already in slot order
+    queue = list(
+        PreOrder.objects.filter(canteen_id=canteen_id, date=date.today(), status__in=['confirmed', 'ready'])
+        .order_by('pickup_slot__start_time', 'pickup_slot_id', 'created_at')
+        .values('order_number', 'status', 'quantity', 'dish__name', 'user__username',
+                'pickup_slot_id', 'pickup_slot__start_time', 'pickup_slot__end_time')
+    )
+    
+    if wants_json:
+        return JsonResponse({'queue': queue})
+    
+    slots = []
+    for order in queue:
+        if not slots or slots[-1]['id'] != order['pickup_slot_id']:
+            slots.append({
+                'id': order['pickup_slot_id'],
+                'start_time': order['pickup_slot__start_time'],
+                'end_time': order['pickup_slot__end_time'],
+                'orders': [],
+                'ready_count': 0,
+            })
+        slots[-1]['orders'].append(order)
+        if order['status'] == 'ready':
+            slots[-1]['ready_count'] += 1
+    
+    return render(request, 'canteen/admin/pickup_counter.html', {'slots': slots, 'today': date.today()})
+
+
+@staff_member_required
+def kitchen_schedule(request):
+    """Staff view of when to start cooking each batch of confirmed orders for a date"""
+    try:
+        day = date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        day = date.today()
+    
+    schedule = build_kitchen_schedule(day, current_outlet_id(request))
+    
+    if _wants_json(request):
+        timeline = [
+            {
+                'station': batch['station'],
+                'dish_id': batch['dish_id'],
+                'dish_name': batch['dish_name'],
+                'slot_id': batch['slot_id'],
+                'portions': batch['portions'],
+                'start': batch['start'].isoformat(),
+                'end': batch['end'].isoformat(),
+                'deadline': batch['deadline'].isoformat(),
+                'early_start': batch['early_start'],
+            }
+            for batch in schedule['timeline']
+        ]
+        return JsonResponse({
+            'date': day.isoformat(),
+            'stations': schedule['stations'],
+            'batch_count': schedule['batch_count'],
+            'portion_count': schedule['portion_count'],
+            'early_starts': schedule['early_starts'],
+            'timeline': timeline,
+        })
+    
+    return render(request, 'canteen/admin/kitchen_schedule.html', {'schedule': schedule})
+
+
+# ---------------- Request Profiles ---------------- #
+@staff_member_required
+def request_profiles(request):
+    """Staff list of the slowest profiled requests, or one profile's top functions and templates"""
+    profile_id = request.GET.get('id')
+    if profile_id:
+        profile = load_profile(profile_id)
+        if profile is None:
+            raise Http404('Profile not found')
+        if request.GET.get('download'):
+            response = HttpResponse((profile_dir() / f'{profile["id"]}.prof').read_bytes(), content_type='application/octet-stream')
+            response['Content-Disposition'] = f'attachment; filename="{profile["id"]}.prof"'
+            return response
+        return render(request, 'canteen/admin/request_profiles.html', {'profile': profile})
+    
+    profiles = load_profiles()
+    context = {
+        'profiles': profiles[:50],
+        'profile_count': len(profiles),
+        'connection_stats': connection_stats(),
+    }
+    return render(request, 'canteen/admin/request_profiles.html', context)
+
+
 # ---------------- Logout View ---------------- #
 @login_required
 def logout_view(request):
@@ -0,0 +1,106 @@
+"""
+First come, first served waitlist for full pickup slots.
+
+Students who find a slot full can queue for it. When an order in the slot is
+cancelled, promote_waiting() turns the oldest waiting entries into orders in
+the same transaction as the cancellation, so a freed place is never lost or
+given out twice.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .audit import record_status_change
+from .models import PickupSlot, PreOrder, WaitlistEntry
+from .notifications import queue_waitlist_promoted
+from .stock import reserve_stock
+
+
+def join_waitlist(user, dish, slot, day, quantity, special_instructions=''):
+    """Queue a student for a full slot, returning (entry, created)"""
+    existing = WaitlistEntry.objects.filter(user=user, dish=dish, pickup_slot=slot, date=day, status='waiting').first()
+    if existing:
+        return existing, False
+    try:
+        with transaction.atomic():
+            entry = WaitlistEntry.objects.create(
+                user=user,
+                dish=dish,
+                pickup_slot=slot,
+                date=day,
+                quantity=quantity,
+                special_instructions=special_instructions,
+            )
+    except IntegrityError:
+        # A concurrent submit created the waiting entry first
+        return WaitlistEntry.objects.get(user=user, dish=dish, pickup_slot=slot, date=day, status='waiting'), False
+    return entry, True
+
+
+def leave_waitlist(entry):
+    """Take a waiting entry out of the queue, returning False if it was already promoted or left"""
+    return bool(WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(status='left', updated_at=timezone.now()))
+
+
+def waiting_entries(slot, day):
+    """The queue for a slot and date, oldest first, read in waitlist_queue_idx order"""
+    return WaitlistEntry.objects.filter(pickup_slot=slot, date=day, status='waiting').order_by('created_at', 'id')
+
+
+def queue_positions(entries):
+    """{entry id: 1-based place in its queue} for waiting entries"""
+    positions = {}
+    for entry in entries:
+        if entry.status != 'waiting':
+            continue
+        ahead = waiting_entries(entry.pickup_slot_id, entry.date).filter(
+            Q(created_at__lt=entry.created_at) | Q(created_at=entry.created_at, id__lt=entry.id)
+        ).count()
+        positions[entry.id] = ahead + 1
+    return positions
+
+
+def promote_waiting(slot, day):
+    """Book the oldest waiting students into the free places of a slot.
+
+    Call inside the transaction that freed the places. Each entry is claimed
+    with a conditional UPDATE, so concurrent cancellations promote different
+    students; entries whose dish sold out meanwhile are skipped. Returns the
+    new orders.
+    """
+    if isinstance(slot, int):
+        slot = PickupSlot.objects.get(pk=slot)
+    if not slot.is_active:
+        return []
+
+    booked = PreOrder.objects.filter(pickup_slot=slot, date=day, status__in=PickupSlot.ACTIVE_ORDER_STATUSES).count()
+    free = slot.max_orders - booked
+    promoted = []
+    while free > 0:
+        entry = waiting_entries(slot, day).select_related('user', 'dish').first()
+        if entry is None:
+            break
+        if not WaitlistEntry.objects.filter(pk=entry.pk, status='waiting').update(status='promoted', updated_at=timezone.now()):
+            # Another cancellation promoted this student first
+            continue
+        if not entry.dish.is_available or not reserve_stock(entry.dish, day, entry.quantity):
+            WaitlistEntry.objects.filter(pk=entry.pk).update(status='skipped', updated_at=timezone.now())
+            continue
+
+        preorder = PreOrder(
+            user=entry.user,
+            dish=entry.dish,
+            pickup_slot=slot,
+            date=day,
+            quantity=entry.quantity,
+            special_instructions=entry.special_instructions,
+        )
+        preorder.save()
+        WaitlistEntry.objects.filter(pk=entry.pk).update(preorder=preorder)
+        promoted.append(preorder)
+        free -= 1
+
+    if promoted:
+        record_status_change(promoted, 'pending', from_status='')
+        queue_waitlist_promoted(promoted)
+    return promoted
@@ -0,0 +1,116 @@
+"""
+Worker warm-up.
+
+A fresh worker otherwise compiles templates, imports crispy_forms and the
+views, builds the URL resolver, connects to the database and builds the
+menu snapshot while its first visitors wait. warm_up() does all of that when
+campus_canteen/wsgi.py or asgi.py is imported, before the server hands the
+worker any traffic. Turn it off with CANTEEN_WARMUP=False.
+
+Database connections belong to the thread that opened them. Under ASGI, sync
+views run on another thread and open their own; the warmed templates, URLs and
+caches are shared all the same. Servers that fork after importing the
+application (gunicorn --preload) should warm up in the worker instead, so
+that no connection is shared between processes.
+"""
+import logging
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import django
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+from .menu import get_published_menu
+from .outlets import get_outlets
+from .stock import get_stock_levels
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_SUFFIXES = {'.html', '.txt', '.js'}
+DJANGO_DIR = Path(django.__file__).resolve().parent
+
+
+def _template_names():
+    """Every template of the project and third-party apps. Django's own, the admin, are staff only"""
+    names = set()
+    for loader in engines['django'].engine.template_loaders:
+        for child in getattr(loader, 'loaders', [loader]):
+            for directory in child.get_dirs():
+                directory = Path(directory).resolve()
+                if not directory.is_dir() or directory.is_relative_to(DJANGO_DIR):
+                    continue
+                names.update(
+                    path.relative_to(directory).as_posix()
+                    for path in directory.rglob('*') if path.suffix in TEMPLATE_SUFFIXES
+                )
+    return sorted(names)
+
+
+def preload_templates():
+    """Compile templates into the cached loader, which also imports their tag libraries"""
+    engine = engines['django'].engine
+    loaded = 0
+    for name in _template_names():
+        try:
+            engine.get_template(name)
+        except Exception as error:
+            logger.warning('Could not preload template %s: %s', name, error)
+        else:
+            loaded += 1
+    return f'{loaded} templates'
+
+
+def resolve_urls():
+    """Import every urlconf and its views and build the reverse lookup tables"""
+    resolvers = [get_resolver()]
+    count = 0
+    while resolvers:
+        resolver = resolvers.pop()
+        resolver.reverse_dict  # Compiles every pattern of this urlconf
+        resolvers.extend(included for _, included in resolver.namespace_dict.values())
+        count += 1
+    return f'{count} urlconfs'
+
+
+def open_connections():
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return ', '.join(connections)
+
+
+def prime_menu_caches():
+    """Build each outlet's menu snapshot and the stock levels the menu page shows"""
+    outlets = get_outlets()
+    for outlet in outlets:
+        get_published_menu(outlet['id'])
+    get_stock_levels(date.today() + timedelta(days=1))
+    return f'{len(outlets)} outlets'
+
+
+WARMUP_STEPS = [
+    ('templates', preload_templates),
+    ('urls', resolve_urls),
+    ('database', open_connections),
+    ('menu caches', prime_menu_caches),
+]
+
+
+def warm_up():
+    """Run every warm-up step, returning [{'step', 'ms', 'detail'}].
+
+    A failing step is logged and skipped; a worker that cannot warm up still
+    serves requests, just more slowly at first.
+    """
+    timings = []
+    for step, func in WARMUP_STEPS:
+        start = time.perf_counter()
+        try:
+            detail = func()
+        except Exception as error:
+            logger.warning('Warm-up step %s failed: %s', step, error)
+            detail = f'failed: {error}'
+        timings.append({'step': step, 'ms': round((time.perf_counter() - start) * 1000, 2), 'detail': detail})
+    return timings